@@ -0,0 +1 @@
+"""Offline replay harness and benchmarks for the Smart Climate integration."""
@@ -0,0 +1,289 @@
+"""Replay temperature traces through SmartClimate without a running Home Assistant.
+
+``FakeHass`` provides just enough of ``hass.states`` and ``hass.services`` for
+the control path: sensor readings are written into an in-memory state
+machine and every service call is recorded (and applied to the state of the
+target climate entity) instead of reaching a device.
+"""
+import asyncio
+import csv
+import math
+import random
+import time
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.smart_climate.climate import async_setup_platform
+from custom_components.smart_climate.coordinator import SmartClimateCoordinator
+from custom_components.smart_climate.const import (
+    CONF_MAIN_CLIMATE,
+    CONF_OUTDOOR_SENSOR,
+    CONF_SECONDARY_CLIMATE,
+    CONF_SENSOR,
+    CONF_TEMP_THRESHOLD_PRIMARY,
+    CONF_TEMP_THRESHOLD_SECONDARY,
+    CONF_OUTDOOR_HOT_THRESHOLD,
+    DEFAULT_TEMP_THRESHOLD_PRIMARY,
+    DEFAULT_TEMP_THRESHOLD_SECONDARY,
+    DEFAULT_OUTDOOR_HOT_THRESHOLD,
+)
+
+
+class FakeState:
+    """Minimal stand-in for homeassistant.core.State."""
+
+    __slots__ = ("entity_id", "state", "attributes", "last_updated")
+
+    def __init__(self, entity_id, state, attributes=None):
+        self.entity_id = entity_id
+        self.state = state
+        self.attributes = attributes or {}
+        self.last_updated = dt_util.utcnow()
+
+
+class FakeStates:
+    """In-memory replacement for hass.states."""
+
+    def __init__(self):
+        self._states = {}
+
+    def get(self, entity_id):
+        return self._states.get(entity_id)
+
+    def async_set(self, entity_id, state, attributes=None):
+        self._states[entity_id] = FakeState(entity_id, str(state), attributes)
+
+
+class FakeServices:
+    """Records service calls and applies climate calls to the fake states.
+
+    ``latency`` simulates the round-trip time of a (cloud-backed) device.
+    """
+
+    def __init__(self, states, latency=0.0):
+        self._states = states
+        self.latency = latency
+        self.calls = []
+        self.cycles = {}
+
+    async def async_call(self, domain, service, service_data=None, blocking=False, **kwargs):
+        service_data = dict(service_data or {})
+        self.calls.append((domain, service, service_data))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if domain == "climate":
+            self._apply(service_data)
+
+    def _apply(self, service_data):
+        entity_id = service_data["entity_id"]
+        current = self._states.get(entity_id)
+        mode = current.state if current is not None else "off"
+        attributes = dict(current.attributes) if current is not None else {}
+        new_mode = service_data.get("hvac_mode", mode)
+        if "temperature" in service_data:
+            attributes["temperature"] = service_data["temperature"]
+        if mode == "off" and new_mode != "off":
+            self.cycles[entity_id] = self.cycles.get(entity_id, 0) + 1
+        self._states.async_set(entity_id, new_mode, attributes)
+
+
+class FakeHass:
+    """Just enough of HomeAssistant to drive SmartClimate's control path."""
+
+    def __init__(self, latency=0.0):
+        self.states = FakeStates()
+        self.services = FakeServices(self.states, latency)
+        self.data = {}
+
+    def async_create_task(self, target, name=None):
+        return asyncio.get_running_loop().create_task(target, name=name)
+
+
+class ReplayStats:
+    """Counters collected while replaying a trace."""
+
+    def __init__(self):
+        self.decisions = 0
+        self.service_calls = 0
+        self.suppressed = 0
+        self.cycles = 0
+        self.state_writes = 0
+        self.elapsed = 0.0
+
+    @property
+    def decisions_per_second(self):
+        return self.decisions / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "decisions": self.decisions,
+            "decisions_per_second": round(self.decisions_per_second, 1),
+            "service_calls": self.service_calls,
+            "suppressed": self.suppressed,
+            "cycles": self.cycles,
+            "state_writes": self.state_writes,
+            "elapsed": round(self.elapsed, 4),
+        }
+
+
+def load_trace(path):
+    """Load a trace from CSV or Parquet.
+
+    Rows need an ``indoor`` column and may carry ``timestamp`` (seconds),
+    ``outdoor``, ``preset`` and ``target``. Parquet files require pandas.
+    """
+    if str(path).endswith(".parquet"):
+        import pandas as pd
+
+        frame = pd.read_parquet(path)
+        frame = frame.astype(object).where(frame.notna(), None)
+        return [_clean_row(row) for row in frame.to_dict("records")]
+
+    with open(path, newline="") as handle:
+        return [_clean_row(row) for row in csv.DictReader(handle)]
+
+
+def _clean_row(row):
+    cleaned = {}
+    for key in ("timestamp", "indoor", "outdoor", "target"):
+        value = row.get(key)
+        cleaned[key] = None if value in (None, "") else float(value)
+    preset = row.get("preset")
+    cleaned["preset"] = preset or None
+    return cleaned
+
+
+def synthetic_trace(rows, seed=0, preset="comfort"):
+    """Return a deterministic trace of daily indoor/outdoor temperature swings."""
+    rng = random.Random(seed)
+    trace = []
+    for index in range(rows):
+        phase = 2 * math.pi * (index % 1440) / 1440
+        outdoor = 18 + 8 * math.sin(phase) + rng.gauss(0, 0.3)
+        indoor = 21 + 3 * math.sin(phase - 0.5) + rng.gauss(0, 0.2)
+        trace.append({
+            "timestamp": index * 60.0,
+            "indoor": round(indoor, 1),
+            "outdoor": round(outdoor, 1),
+            "target": None,
+            "preset": preset if index == 0 else None,
+        })
+    return trace
+
+
+def make_config(index=0, secondary=True, **overrides):
+    """Return a platform config for one simulated zone."""
+    config = {
+        CONF_MAIN_CLIMATE: f"climate.main_{index}",
+        CONF_SENSOR: f"sensor.indoor_{index}",
+        CONF_OUTDOOR_SENSOR: "sensor.outdoor",
+        CONF_TEMP_THRESHOLD_PRIMARY: DEFAULT_TEMP_THRESHOLD_PRIMARY,
+        CONF_TEMP_THRESHOLD_SECONDARY: DEFAULT_TEMP_THRESHOLD_SECONDARY,
+        CONF_OUTDOOR_HOT_THRESHOLD: DEFAULT_OUTDOOR_HOT_THRESHOLD,
+    }
+    if secondary:
+        config[CONF_SECONDARY_CLIMATE] = f"climate.secondary_{index}"
+    config.update(overrides)
+    return config
+
+
+async def build_entities(hass, configs):
+    """Create SmartClimate entities through the platform setup."""
+    entities = []
+    for config in configs:
+        await async_setup_platform(hass, config, entities.extend)
+    for entity in entities:
+        entity.async_write_ha_state = lambda: None
+    return entities
+
+
+def build_coordinator(hass, entities):
+    """Return a coordinator without a timer that drives ``entities``."""
+    coordinator = SmartClimateCoordinator(hass, interval=None)
+    for entity in entities:
+        coordinator.async_add_entity(entity)
+    return coordinator
+
+
+class SimClock:
+    """Simulated monotonic clock, advanced by the replay."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class _Probe:
+    """Counts the device updates an entity dispatches."""
+
+    def __init__(self, entity, stats):
+        self.issued = 0
+        dispatch = entity._async_dispatch
+
+        def counting_dispatch(device_commands, *args):
+            self.issued += len(device_commands)
+            dispatch(device_commands, *args)
+
+        def write_state():
+            stats.state_writes += 1
+
+        entity._async_dispatch = counting_dispatch
+        entity.async_write_ha_state = write_state
+
+
+async def replay(hass, entities, trace, stats=None, coordinator=None, step=60.0):
+    """Replay ``trace`` through every entity and return the collected stats.
+
+    Each row updates the sensors and runs one control tick per entity, or a
+    preset change when the row carries a new preset. With a ``coordinator``
+    the ticks run through its shared update cycle instead of per entity.
+    Entities run on a simulated clock that follows the row timestamps, or
+    advances by ``step`` seconds per row when there are none.
+    """
+    stats = stats or ReplayStats()
+    probes = [_Probe(entity, stats) for entity in entities]
+    clock = SimClock()
+    for entity in entities:
+        entity._clock = clock
+    calls_before = len(hass.services.calls)
+    cycles_before = sum(hass.services.cycles.values())
+
+    start = time.perf_counter()
+    for row in trace:
+        clock.now = row["timestamp"] if row.get("timestamp") is not None else clock.now + step
+        issued = [probe.issued for probe in probes]
+        for entity in entities:
+            if row["indoor"] is not None:
+                for sensor in entity._sensors:
+                    hass.states.async_set(sensor, row["indoor"])
+            if row["outdoor"] is not None:
+                for sensor in entity._outdoor_sensors:
+                    hass.states.async_set(sensor, row["outdoor"])
+
+        if row["preset"] is not None:
+            for entity in entities:
+                await entity.async_set_preset_mode(row["preset"])
+        elif row["target"] is not None:
+            for entity in entities:
+                await entity.async_set_temperature(temperature=row["target"])
+        elif coordinator is not None:
+            await coordinator.async_refresh()
+        else:
+            for entity in entities:
+                await entity._async_run_update()
+        # Ticks are far apart in reality, so let the devices settle in between.
+        for entity in entities:
+            await entity.async_join_commands()
+
+        for entity, probe, before in zip(entities, probes, issued):
+            stats.decisions += 1
+            # Every tick could update each device; updates not sent were suppressed.
+            devices = len(entity.devices)
+            stats.suppressed += max(devices - (probe.issued - before), 0)
+    stats.elapsed += time.perf_counter() - start
+
+    stats.service_calls += len(hass.services.calls) - calls_before
+    stats.cycles += sum(hass.services.cycles.values()) - cycles_before
+    return stats
@@ -0,0 +1,62 @@
+"""Run the fixed Smart Climate benchmark set.
+
+Usage::
+
+    python -m benchmarks.run [--trace trace.csv] [--only NAME]
+
+Without ``--trace`` a deterministic synthetic trace is used, so results are
+comparable between runs.
+"""
+import argparse
+import asyncio
+import json
+
+from .harness import (
+    FakeHass,
+    build_coordinator,
+    build_entities,
+    load_trace,
+    make_config,
+    replay,
+    synthetic_trace,
+)
+
+# name -> (entities, dual device, trace rows, simulated service latency, shared coordinator)
+BENCHMARKS = {
+    "single_device": (1, False, 10080, 0.0, False),
+    "dual_device": (1, True, 10080, 0.0, False),
+    "dual_device_slow": (1, True, 1440, 0.01, False),
+    "entities_1000": (1000, True, 60, 0.0, False),
+    "entities_1000_shared": (1000, True, 60, 0.0, True),
+}
+
+
+async def run_benchmark(name, trace=None):
+    """Run one benchmark and return its stats as a dict."""
+    count, dual, rows, latency, shared = BENCHMARKS[name]
+    hass = FakeHass(latency)
+    entities = await build_entities(
+        hass, [make_config(index, secondary=dual) for index in range(count)]
+    )
+    coordinator = build_coordinator(hass, entities) if shared else None
+    stats = await replay(hass, entities, trace or synthetic_trace(rows), coordinator=coordinator)
+    return {"benchmark": name, "entities": count, **stats.as_dict()}
+
+
+async def run_all(names, trace=None):
+    return [await run_benchmark(name, trace) for name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trace", help="CSV or Parquet trace to replay")
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), action="append")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else None
+    for result in asyncio.run(run_all(args.only or list(BENCHMARKS), trace)):
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Measure how long it takes until the entities of many config entries are ready.
+
+Usage::
+
+    python -m benchmarks.startup [--entries N ...]
+
+Unlike the replay benchmarks this runs a real (not started) Home Assistant
+core, with its entity platform, state machine and restore state, so the
+setup path is the one used during boot. For every entry count it reports
+the time until all entities are added (``setup``), the time from
+``homeassistant_started`` until they have restored and run their first
+update (``started``), and the sum of both (``ready``).
+
+It also reports how long importing the integration and its climate
+platform takes in a fresh interpreter, on top of the Home Assistant
+modules that are loaded before them anyway.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
+from homeassistant.core import CoreState, HomeAssistant
+from homeassistant.helpers import device_registry, entity, entity_platform, entity_registry, restore_state
+
+from custom_components.smart_climate import climate
+from custom_components.smart_climate.const import DATA_COORDINATOR, DATA_METRICS, DOMAIN
+from custom_components.smart_climate.coordinator import SmartClimateCoordinator
+from custom_components.smart_climate.metrics import EntityMetrics
+
+from .harness import make_config
+
+ENTRY_COUNTS = (1, 50, 500)
+
+IMPORT_MODULES = ("custom_components.smart_climate", "custom_components.smart_climate.climate")
+# Loaded by Home Assistant before the integration, so not counted.
+PRELOADED_MODULES = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.components.climate",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.restore_state",
+)
+# The fastest of this many imports is reported.
+IMPORT_RUNS = 5
+
+
+def make_entry(index):
+    """Return a stand-in for a config entry of one zone, as created by the UI."""
+    return SimpleNamespace(
+        entry_id=f"entry_{index}",
+        title=f"Zone {index}",
+        data=MappingProxyType(make_config(index)),
+        options=MappingProxyType({}),
+    )
+
+
+async def run_startup(count):
+    """Set up ``count`` entries in a fresh core and return the timings in ms."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        hass.state = CoreState.starting
+        entity.async_setup(hass)
+        await device_registry.async_load(hass)
+        await entity_registry.async_load(hass)
+        await restore_state.async_load(hass)
+        # Without a timer; the periodic update is not part of the startup.
+        hass.data[DOMAIN] = {DATA_COORDINATOR: SmartClimateCoordinator(hass, interval=None)}
+        platform = entity_platform.EntityPlatform(
+            hass=hass,
+            logger=logging.getLogger(__name__),
+            domain="climate",
+            platform_name=DOMAIN,
+            platform=None,
+            scan_interval=timedelta(seconds=30),
+            entity_namespace=None,
+        )
+        for index in range(count):
+            hass.states.async_set(f"sensor.indoor_{index}", "20.5")
+        hass.states.async_set("sensor.outdoor", "12.0")
+
+        started = time.perf_counter()
+        entities = []
+        for index in range(count):
+            entry = make_entry(index)
+            hass.data[DOMAIN][entry.entry_id] = {DATA_METRICS: EntityMetrics()}
+            await climate.async_setup_entry(hass, entry, entities.extend)
+        await platform.async_add_entities(entities)
+        await hass.async_block_till_done()
+        setup = time.perf_counter() - started
+
+        started = time.perf_counter()
+        hass.state = CoreState.running
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_STARTED)
+        await hass.async_block_till_done()
+        ready = time.perf_counter() - started
+        updates = sum(entity._metrics.updates for entity in entities)
+
+        await hass.async_stop(force=True)
+    return {
+        "entries": count,
+        "entities": len(entities),
+        "updates": updates,
+        "setup_ms": round(setup * 1000, 1),
+        "started_ms": round(ready * 1000, 1),
+        "ready_ms": round((setup + ready) * 1000, 1),
+    }
+
+
+def measure_import(module):
+    """Return how long importing ``module`` takes in a fresh interpreter, in ms."""
+    code = (
+        f"import time, {', '.join(PRELOADED_MODULES)}\n"
+        "started = time.perf_counter()\n"
+        f"import {module}\n"
+        "print((time.perf_counter() - started) * 1000)\n"
+    )
+    timings = [
+        float(subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout)
+        for _ in range(IMPORT_RUNS)
+    ]
+    return {"import": module, "import_ms": round(min(timings), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, action="append", help="number of config entries")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    for module in IMPORT_MODULES:
+        print(json.dumps(measure_import(module)))
+    for count in args.entries or ENTRY_COUNTS:
+        print(json.dumps(asyncio.run(run_startup(count))))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,88 @@
 """Initialize the Dual Thermostat integration."""
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import callback
+
+from .const import DATA_COORDINATOR, DATA_ENTITY, DATA_FORECAST, DATA_METRICS
+
+_LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "smart_climate"
 
+PLATFORMS = ["climate", "sensor"]
+
+
+def entry_config(entry):
+    """Return the configuration of an entry, with its options applied."""
+    return {**entry.data, **entry.options}
+
+
+@callback
+def async_get_coordinator(hass):
+    """Return the coordinator shared by all Smart Climate entities."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_COORDINATOR not in data:
+        from .coordinator import SmartClimateCoordinator  # Not needed to load the integration.
+
+        data[DATA_COORDINATOR] = SmartClimateCoordinator(hass)
+    return data[DATA_COORDINATOR]
+
+
+@callback
+def async_get_forecast_cache(hass):
+    """Return the weather forecast cache shared by all Smart Climate entities."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_FORECAST not in data:
+        from .forecast import ForecastCache  # Only needed with a weather entity.
+
+        data[DATA_FORECAST] = ForecastCache(hass)
+    return data[DATA_FORECAST]
+
 
 async def async_setup(hass, config):
     """Set up the Smart Thermostat component."""
-    # Global setup (if needed)
+    async_get_coordinator(hass)
     return True
 
 
 async def async_setup_entry(hass, entry):
     """Set up Smart Climate from a config entry."""
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {}
+    from .metrics import EntityMetrics
+
+    async_get_coordinator(hass)
+    # The metrics are shared by the climate entity, its diagnostic sensors and diagnostics.
+    hass.data[DOMAIN][entry.entry_id] = {DATA_METRICS: EntityMetrics()}
 
-    result = await hass.config_entries.async_forward_entry_setups(entry, ["climate"])
+    result = await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
 
 
+async def async_update_options(hass, entry):
+    """Apply changed options to the running entity without reloading it."""
+    from .plan import compile_plan, config_wiring
+
+    entity = hass.data[DOMAIN].get(entry.entry_id, {}).get(DATA_ENTITY)
+    config = entry_config(entry)
+    try:
+        plan = compile_plan(config)
+        # Changing a device or sensor rewires the entity, which needs a reload.
+        wiring = config_wiring(config)
+    except vol.Invalid as err:
+        _LOGGER.error("Ignoring invalid Smart Climate options for %s: %s", entry.title, err)
+        return
+    if entity is None or wiring != entity.wiring:
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    await entity.async_apply_plan(plan)
+
+
 async def async_unload_entry(hass, entry):
     """Unload a config entry."""
     try:
-        unload_ok = await hass.config_entries.async_forward_entry_unload(entry, "climate")
+        unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     except ValueError:
         # If the config entry was never loaded, we can just return True.
         unload_ok = True
@@ -1,6 +1,7 @@
-import json
 import logging
+import time
 from datetime import timedelta
+from functools import partial
 
 import voluptuous as vol
 
@@ -9,74 +10,147 @@ import homeassistant.helpers.config_validation as cv
 
 from homeassistant.components.climate.const import HVACMode, ClimateEntityFeature
 from homeassistant.const import UnitOfTemperature
-from homeassistant.helpers.template import Template
-from homeassistant.util.dt import now
-from homeassistant.helpers.event import async_track_time_interval  # <-- Import periodic tracker
-from homeassistant.helpers.restore_state import RestoreEntity  # <-- Import restore state
+from homeassistant.core import callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_track_point_in_time, async_track_state_change_event
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity  # <-- Import restore state
+from homeassistant.helpers.start import async_at_started
+from homeassistant.util import dt as dt_util
+from . import async_get_coordinator, async_get_forecast_cache, entry_config
 from .const import *
+from .coordinator import LAST_REPORTED_SUPPORTED, UNAVAILABLE_STATES, read_temperature
+from .decision import MODE_COOL, MODE_HEAT, MODE_OFF, Commands, StageCommand, decide
+from .device import ClimateDevice
+from .forecast import FORECAST_AGGREGATES
+from .fusion import FUSION_STRATEGIES, SensorFusion
+from .metrics import EntityMetrics
+from .thermal import ThermalModel
+from .plan import compile_plan, config_sensors, config_stages, validate_presets
+from .schedule import validate_schedule
+from .trace import DecisionTrace
+from .dispatch import DeviceCommand
 
 _LOGGER = logging.getLogger(__name__)
 
+STAGE_SCHEMA = vol.Schema({
+    vol.Required(CONF_STAGE_CLIMATE): cv.string,
+    vol.Required(CONF_STAGE_THRESHOLD): vol.Coerce(float),
+    vol.Optional(CONF_STAGE_OFFSET, default=0.0): vol.Coerce(float),
+    vol.Optional(CONF_STAGE_MODES, default=STAGE_MODES): vol.All(cv.ensure_list, [vol.In(STAGE_MODES)]),
+})
+
 # Extend the platform schema with our custom configuration.
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
     vol.Required(CONF_MAIN_CLIMATE): cv.string,
     vol.Optional(CONF_SECONDARY_CLIMATE): cv.string,  # Made optional instead of required
-    vol.Required(CONF_SENSOR): cv.string,
-    vol.Optional(CONF_OUTDOOR_SENSOR): cv.string,
+    vol.Required(CONF_SENSOR): vol.All(cv.ensure_list, [cv.string], vol.Length(min=1)),
+    vol.Optional(CONF_OUTDOOR_SENSOR): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(CONF_WEATHER): cv.string,
+    vol.Optional(CONF_FORECAST_HORIZON_HOURS, default=DEFAULT_FORECAST_HORIZON_HOURS): vol.All(vol.Coerce(float), vol.Range(min=1)),
+    vol.Optional(CONF_FORECAST_AGGREGATE, default=DEFAULT_FORECAST_AGGREGATE): vol.In(FORECAST_AGGREGATES),
+    vol.Optional(CONF_PRICE_SENSOR): cv.string,
+    vol.Optional(CONF_TARIFF_COMFORT_MARGIN, default=DEFAULT_TARIFF_COMFORT_MARGIN): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(CONF_SENSOR_FUSION, default=DEFAULT_SENSOR_FUSION): vol.In(FUSION_STRATEGIES),
+    vol.Optional(CONF_SENSOR_WINDOW, default=DEFAULT_SENSOR_WINDOW): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(CONF_SENSOR_EMA_ALPHA, default=DEFAULT_SENSOR_EMA_ALPHA): vol.All(vol.Coerce(float), vol.Range(min=0, max=1, min_included=False)),
+    vol.Optional(CONF_SENSOR_MAX_AGE_SECONDS, default=DEFAULT_SENSOR_MAX_AGE_SECONDS): vol.Coerce(float),
+    vol.Optional(CONF_PREDICTIVE_LEAD_SECONDS, default=DEFAULT_PREDICTIVE_LEAD_SECONDS): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(CONF_WARM_START_DAYS, default=DEFAULT_WARM_START_DAYS): vol.All(vol.Coerce(float), vol.Range(min=0)),
     vol.Optional(CONF_TEMP_THRESHOLD_PRIMARY, default=DEFAULT_TEMP_THRESHOLD_PRIMARY): vol.Coerce(float),
     vol.Optional(CONF_TEMP_THRESHOLD_SECONDARY, default=DEFAULT_TEMP_THRESHOLD_SECONDARY): vol.Coerce(float),
     vol.Optional(CONF_OUTDOOR_HOT_THRESHOLD, default=DEFAULT_OUTDOOR_HOT_THRESHOLD): vol.Coerce(float),
     vol.Optional(CONF_PRIMARY_OFFSET, default=DEFAULT_PRIMARY_OFFSET): vol.Coerce(float),
     vol.Optional(CONF_SECONDARY_OFFSET, default=DEFAULT_SECONDARY_OFFSET): vol.Coerce(float),
-    vol.Optional(CONF_HEATING_PRESETS, default=DEFAULT_HEATING_PRESETS): str,
-    vol.Optional(CONF_COOLING_PRESETS, default=DEFAULT_COOLING_PRESETS): str,
-
+    vol.Optional(CONF_STAGES, default=[]): vol.All(cv.ensure_list, [STAGE_SCHEMA]),
+    vol.Optional(CONF_HEATING_PRESETS, default=DEFAULT_HEATING_PRESETS): validate_presets,
+    vol.Optional(CONF_COOLING_PRESETS, default=DEFAULT_COOLING_PRESETS): validate_presets,
+    vol.Optional(CONF_SCHEDULE): validate_schedule,
+    vol.Optional(CONF_DEBOUNCE_SECONDS, default=DEFAULT_DEBOUNCE_SECONDS): vol.Coerce(float),
+    vol.Optional(CONF_MERGE_COMMANDS, default=DEFAULT_MERGE_COMMANDS): cv.boolean,
+    vol.Optional(CONF_MIN_RUNTIME_SECONDS, default=DEFAULT_MIN_RUNTIME_SECONDS): vol.Coerce(float),
+    vol.Optional(CONF_MIN_OFF_SECONDS, default=DEFAULT_MIN_OFF_SECONDS): vol.Coerce(float),
+    vol.Optional(CONF_MAX_SWITCHES_PER_HOUR, default=DEFAULT_MAX_SWITCHES_PER_HOUR): vol.Coerce(int),
+    vol.Optional(CONF_PUBLISH_DEADBAND, default=DEFAULT_PUBLISH_DEADBAND): vol.Coerce(float),
+    vol.Optional(CONF_PUBLISH_HEARTBEAT_SECONDS, default=DEFAULT_PUBLISH_HEARTBEAT_SECONDS): vol.Coerce(float),
 })
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the Smart Climate platform from a config entry."""
-    config = config_entry.data
-    await async_setup_platform(hass, config, async_add_entities)
+    config = entry_config(config_entry)
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    try:
+        entity = _create_entity(hass, config, entry_data[DATA_METRICS])
+    except vol.Invalid as err:
+        _LOGGER.error("Invalid Smart Climate configuration for %s: %s", config_entry.title, err)
+        return False
+    # Kept so option changes can be applied to the running entity.
+    entry_data[DATA_ENTITY] = entity
+    async_add_entities([entity])
     return True
 
 
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the Smart Climate platform."""
-    main_climate = config.get(CONF_MAIN_CLIMATE)
-    secondary_climate = config.get(CONF_SECONDARY_CLIMATE)  # May be None
-    sensor = config.get(CONF_SENSOR)
-    outdoor_sensor = config.get(CONF_OUTDOOR_SENSOR)
-    primary_threshold = config.get(CONF_TEMP_THRESHOLD_PRIMARY)
-    secondary_threshold = config.get(CONF_TEMP_THRESHOLD_SECONDARY)
-    heating_presets = config.get(CONF_HEATING_PRESETS, DEFAULT_HEATING_PRESETS)
-    cooling_presets = config.get(CONF_COOLING_PRESETS, DEFAULT_COOLING_PRESETS)
-    outdoor_hot_threshold = config.get(CONF_OUTDOOR_HOT_THRESHOLD)
-    primary_offset = config.get(CONF_PRIMARY_OFFSET, DEFAULT_PRIMARY_OFFSET)
-    secondary_offset = config.get(CONF_SECONDARY_OFFSET, DEFAULT_SECONDARY_OFFSET)
-
-    if isinstance(heating_presets, str):
-        heating_presets = json.loads(heating_presets)
-
-    if isinstance(cooling_presets, str):
-        cooling_presets = json.loads(cooling_presets)
-
-    async_add_entities([
-        SmartClimate(
-            hass,
-            main_climate,
-            secondary_climate,
-            sensor,
-            outdoor_sensor,
-            primary_threshold,
-            secondary_threshold,
-            heating_presets,
-            cooling_presets,
-            outdoor_hot_threshold,
-            primary_offset,
-            secondary_offset,
-        )
-    ])
+    try:
+        entity = _create_entity(hass, config)
+    except vol.Invalid as err:
+        _LOGGER.error("Invalid Smart Climate configuration: %s", err)
+        return
+    async_add_entities([entity])
+
+
+def _switches(previous_mode, mode):
+    """Return whether going from ``previous_mode`` to ``mode`` switches a device on or off."""
+    return (previous_mode != HVACMode.OFF) != (mode != HVACMode.OFF)
+
+
+def _create_entity(hass, config, metrics=None):
+    """Create a SmartClimate entity from its configuration.
+
+    Raises ``vol.Invalid`` when the configuration cannot be compiled.
+    """
+    stages = config_stages(config)
+    return SmartClimate(
+        hass,
+        config.get(CONF_MAIN_CLIMATE),
+        [entity_id for entity_id, _ in stages],
+        config_sensors(config, CONF_SENSOR),
+        config_sensors(config, CONF_OUTDOOR_SENSOR),
+        compile_plan(config, stages),
+        metrics,
+        config.get(CONF_WEATHER),
+        config.get(CONF_PRICE_SENSOR),
+    )
+
+
+class SmartClimateExtraStoredData(ExtraStoredData):
+    """Commands last confirmed by the devices and the thermal model, kept across restarts."""
+
+    def __init__(self, commands, model=None):
+        self.commands = commands
+        # ThermalModel.as_dict() output; checked against the devices on restore.
+        self.model = model
+
+    def as_dict(self):
+        commands = self.commands
+        return {
+            "commands": {
+                "main_mode": commands.main_mode,
+                "main_temp": commands.main_temp,
+                "stages": [list(stage) for stage in commands.stages],
+            },
+            "model": self.model,
+        }
+
+    @classmethod
+    def from_dict(cls, restored):
+        try:
+            commands = restored["commands"]
+            stages = tuple(StageCommand(*stage) for stage in commands["stages"])
+            return cls(Commands(commands["main_mode"], commands["main_temp"], stages), restored.get("model"))
+        except (KeyError, TypeError):
+            return None
 
 
 class SmartClimate(ClimateEntity, RestoreEntity):
@@ -84,32 +158,36 @@ class SmartClimate(ClimateEntity, RestoreEntity):
     _attr_temperature_unit = UnitOfTemperature.CELSIUS
     _attr_supported_features = ClimateEntityFeature.PRESET_MODE
     _attr_hvac_modes = [HVACMode.AUTO]
+    # The coordinator and the sensor listeners drive the updates; polling
+    # would write every state and bypass the publish deadband.
+    _attr_should_poll = False
 
-    def __init__(self, hass, main_climate, secondary_climate, sensor, outdoor_sensor,
-                 primary_threshold, secondary_threshold, heating_presets, cooling_presets,
-                 outdoor_hot_threshold,
-                 primary_offset, secondary_offset):
+    def __init__(self, hass, main_climate, stage_climates, sensors, outdoor_sensors,
+                 plan, metrics=None, weather=None, price_sensor=None):
         self.hass = hass
         self._main_climate = main_climate
-        self._secondary_climate = secondary_climate  # May be None if not configured
-        self._sensor = sensor
-        self._outdoor_sensor = outdoor_sensor
-        self._primary_threshold = primary_threshold
-        self._secondary_threshold = secondary_threshold
-        self._heating_presets = heating_presets
-        self._cooling_presets = cooling_presets
-        self._outdoor_hot_threshold = outdoor_hot_threshold
-        self._last_switch_time = now()
-
-        # Track last commands sent to avoid redundant service calls.
-        self._last_main_mode = HVACMode.OFF
-        self._last_main_temp = None
-        self._last_secondary_mode = HVACMode.OFF
-        self._last_secondary_temp = None
-
-        # Offsets for target temperature.
-        self._primary_offset = primary_offset
-        self._secondary_offset = secondary_offset
+        # Boost devices, in the order of the plan's stages.
+        self._stage_climates = tuple(stage_climates)
+        self._sensors = tuple(sensors)
+        self._outdoor_sensors = tuple(outdoor_sensors)
+        # The forecast cache is shared by all entities; set once added to hass.
+        self._weather = weather or None
+        self._forecast = None
+        # Heating planned against the tariff; re-planned when the prices or
+        # the target change.
+        self._price_sensor = price_sensor or None
+        self._tariff_plan = None
+        self._tariff_key = None
+        self._tracked_sensors = self._sensors + self._outdoor_sensors
+        # Compiled settings, shared with other entities using the same settings.
+        self._plan = plan
+        # Handed out on every state write, so built once per plan.
+        self._attr_preset_modes = list(plan.preset_modes)
+        self._clock = time.monotonic
+
+        # Several sensors per input are fused into one reading.
+        self._indoor = self._create_fusion(self._sensors)
+        self._outdoor = self._create_fusion(self._outdoor_sensors) if self._outdoor_sensors else None
 
         # Attributes shown by Home Assistant.
         self._attr_target_temperature = None
@@ -117,20 +195,54 @@ class SmartClimate(ClimateEntity, RestoreEntity):
         self._attr_hvac_mode = HVACMode.AUTO
         self._attr_preset_mode = "eco"
 
+        # Sensor changes are coalesced so a burst of readings triggers one update.
+        self._debouncer = None
+
+        # The state is only written when it changed significantly, or at
+        # least once per heartbeat.
+        self._published = None
+        self._published_at = None
+
+        # Performance counters, shared with the diagnostics and sensor platforms.
+        self._metrics = metrics if metrics is not None else EntityMetrics()
+
+        # Every device has its own command queue and cycle guard. Commands are
+        # sent in the background and the last confirmed command of a device
+        # is cached to avoid redundant service calls.
+        self._main = ClimateDevice(hass, main_climate, plan, self._metrics)
+        self._stages = tuple(
+            ClimateDevice(hass, entity_id, plan, self._metrics) for entity_id in self._stage_climates
+        )
+        self._devices = {device.entity_id: device for device in (self._main, *self._stages)}
+
+        # Recent decisions, downloadable with the diagnostics.
+        self._trace = DecisionTrace()
+
+        # Learns how the room responds to the outdoor temperature and the devices.
+        self._model = ThermalModel(self._devices)
+
+        # Single-flight protection for _apply_temperature.
+        self._update_in_flight = False
+        self._update_pending = False
+
+        self._start_unsub = None
         self._update_unsub = None
+        self._state_unsub = None
+        self._warm_start_task = None
+
+        # The weekly schedule arms one timer, for its next (time, preset)
+        # transition. A manual preset or target holds until then.
+        self._schedule_unsub = None
+        self._schedule_next = None
+        self._override_until = None
 
         # Ensure the entity has a unique ID for UI management.
-        if self._secondary_climate:
-            self._attr_unique_id = f"smart_climate_{main_climate}_{secondary_climate}"
-        else:
-            self._attr_unique_id = f"smart_climate_{main_climate}"
+        self._attr_unique_id = "_".join(["smart_climate", *self._devices])
 
     @property
     def name(self):
         """Return the name of the smart climate controller."""
-        if self._secondary_climate:
-            return f"Smart Climate ({self._main_climate} + {self._secondary_climate})"
-        return f"Smart Climate ({self._main_climate})"
+        return f"Smart Climate ({' + '.join(self._devices)})"
 
     @property
     def current_temperature(self):
@@ -150,14 +262,39 @@ class SmartClimate(ClimateEntity, RestoreEntity):
     @property
     def preset_modes(self):
         """Return a list of available preset modes."""
-        return list({**self._heating_presets, **self._cooling_presets}.keys())
+        return self._attr_preset_modes
 
     @property
     def extra_state_attributes(self):
-        return {
+        attributes = {
             "target_temperature": self._attr_target_temperature,
             "preset_mode": self._attr_preset_mode,
         }
+        if self._schedule_next is not None:
+            attributes["next_preset"] = self._schedule_next[1]
+            attributes["next_preset_at"] = self._schedule_next[0].isoformat()
+            attributes["preset_override_until"] = (
+                self._override_until.isoformat() if self._override_until else None
+            )
+        return attributes
+
+    @property
+    def tracked_sensors(self):
+        """Return the sensors this entity reads on every update."""
+        return self._tracked_sensors
+
+    @property
+    def wiring(self):
+        """Return the (main, stages, sensor, outdoor sensor, weather, price sensor) entity_ids."""
+        return (
+            self._main_climate, self._stage_climates, self._sensors, self._outdoor_sensors,
+            self._weather, self._price_sensor,
+        )
+
+    @property
+    def devices(self):
+        """Return the entity_ids of all controlled devices, main device first."""
+        return tuple(self._devices)
 
     @property
     def effective_main_device(self):
@@ -166,8 +303,8 @@ class SmartClimate(ClimateEntity, RestoreEntity):
 
     @property
     def effective_secondary_device(self):
-        """Return the entity_id of the secondary climate device, if configured."""
-        return self._secondary_climate
+        """Return the entity_id of the first boost device, if configured."""
+        return self._stage_climates[0] if self._stage_climates else None
 
     async def async_set_temperature(self, **kwargs):
         """Set a new target temperature (manual override)."""
@@ -176,203 +313,655 @@ class SmartClimate(ClimateEntity, RestoreEntity):
             return
 
         self._attr_target_temperature = temperature
-        await self._apply_temperature()
-        self.async_write_ha_state()
+        self._start_override()
+        await self._async_run_update()
 
     async def async_set_preset_mode(self, preset_mode):
         """Set a new preset mode and update the target temperature accordingly.
         """
-        if preset_mode not in self._heating_presets and preset_mode not in self._cooling_presets:
+        if preset_mode not in self._plan.preset_table:
             _LOGGER.error("Preset mode %s not recognized", preset_mode)
             return
 
-        self._attr_preset_mode = preset_mode
-
-        sensor_state = self.hass.states.get(self._sensor)
-        current_temp = None
-        if sensor_state is not None and sensor_state.state not in ["unknown", "unavailable"]:
-            try:
-                current_temp = float(sensor_state.state)
-            except Exception as e:
-                _LOGGER.error("Error reading sensor %s: %s", self._sensor, e)
-
-        if current_temp is not None and preset_mode in self._heating_presets and preset_mode in self._cooling_presets:
-            heating_target = self._heating_presets[preset_mode]
-            cooling_target = self._cooling_presets[preset_mode]
-            if heating_target is None:
-                self._attr_target_temperature = cooling_target
-            elif cooling_target is None:
-                self._attr_target_temperature = heating_target
-            else:
-                midpoint = (heating_target + cooling_target) / 2
-                if current_temp < midpoint:
-                    self._attr_target_temperature = heating_target
-                else:
-                    self._attr_target_temperature = cooling_target
-
-        elif preset_mode in self._heating_presets:
-            self._attr_target_temperature = self._heating_presets[preset_mode]
-        elif preset_mode in self._cooling_presets:
-            self._attr_target_temperature = self._cooling_presets[preset_mode]
+        self._select_preset(preset_mode)
+        self._start_override()
+        await self._async_run_update()
 
+    def _select_preset(self, preset_mode):
+        self._attr_preset_mode = preset_mode
+        self._attr_target_temperature = self._plan.target_for(
+            preset_mode, self._read_fused(self._indoor)
+        )
         _LOGGER.debug("Preset mode set to %s; Target temp: %s", preset_mode, self._attr_target_temperature)
-        await self._apply_temperature()
-        self.async_write_ha_state()
 
-    async def _apply_temperature(self):
-        sensor_state = self.hass.states.get(self._sensor)
-        if sensor_state is None or sensor_state.state in ["unknown", "unavailable"]:
-            _LOGGER.error("Sensor %s not found or state is unknown/unavailable", self._sensor)
+    def _start_override(self):
+        """Hold a manual change until the next transition of the schedule."""
+        if self._schedule_next is not None:
+            self._override_until = self._schedule_next[0]
+
+    @callback
+    def _async_arm_schedule(self):
+        """Arm the timer for the next transition of the schedule, if there is one."""
+        if self._schedule_unsub:
+            self._schedule_unsub()
+            self._schedule_unsub = None
+        self._schedule_next = None
+        if self._plan.schedule is None:
+            self._override_until = None
             return
+        self._schedule_next = self._plan.schedule.next_transition(dt_util.now())
+        self._schedule_unsub = async_track_point_in_time(
+            self.hass, self._async_schedule_transition, self._schedule_next[0]
+        )
 
-        try:
-            self._attr_current_temperature = float(sensor_state.state)
-        except Exception as e:
-            _LOGGER.error("Error reading sensor %s: %s", self._sensor, e)
+    async def _async_schedule_transition(self, now):
+        """Switch to the preset of the slot that starts now, ending any manual override."""
+        self._schedule_unsub = None
+        preset_mode = self._schedule_next[1]
+        self._override_until = None
+        self._async_arm_schedule()
+        self._select_preset(preset_mode)
+        await self._async_run_update()
+
+    async def async_apply_plan(self, plan):
+        """Switch to a new plan, keeping the caches, timers and preset.
+
+        Used when the options of the entry change. The target is only
+        recalculated when the preset it came from changed.
+        """
+        old_plan = self._plan
+        self._plan = plan
+        if plan.preset_modes != old_plan.preset_modes:
+            self._attr_preset_modes = list(plan.preset_modes)
+        for device in self._devices.values():
+            device.configure(plan)
+        for fusion in (self._indoor, self._outdoor):
+            if fusion is not None:
+                fusion.configure(
+                    plan.sensor_fusion, plan.sensor_window, plan.sensor_ema_alpha, self._sensor_max_age(fusion.entity_ids)
+                )
+        if self._debouncer is not None:
+            self._debouncer.cooldown = plan.debounce_seconds
+
+        preset_mode = self._attr_preset_mode
+        if (
+            preset_mode in plan.preset_table
+            and old_plan.preset_table.get(preset_mode) != plan.preset_table[preset_mode]
+        ):
+            self._attr_target_temperature = plan.target_for(
+                preset_mode, self._read_fused(self._indoor)
+            )
+        if plan.schedule != old_plan.schedule:
+            # A new schedule takes over right away.
+            self._override_until = None
+            self._async_arm_schedule()
+            if plan.schedule is not None:
+                self._select_preset(plan.schedule.active_preset(dt_util.now()))
+        _LOGGER.debug("Applied new settings to %s", self.entity_id)
+        # Publish the next state regardless of the (possibly changed) deadband.
+        self._published = None
+        await self._async_run_update()
+
+    async def _apply_temperature(self, snapshot=None):
+        """Evaluate the sensors and update the devices.
+
+        ``snapshot`` maps sensor entity_ids to readings that were already
+        parsed by the coordinator; sensors missing from it are read directly.
+        """
+        current_temp = self._read_fused(self._indoor, snapshot)
+        if current_temp is None:
+            _LOGGER.debug("No indoor sensor has a recent reading; skipping update")
             return
+        self._attr_current_temperature = current_temp
+
+        now_ts = self._clock()
+        previous = self._previous_commands()
+        modes = (previous.main_mode, *(stage.mode for stage in previous.stages))
+        learn = self._model.due(now_ts)
+        predictive = self._plan.predictive_lead and self._model.samples >= MODEL_MIN_SAMPLES
+
+        # Cooling is gated on the forecast for the coming hours when there
+        # is one, otherwise on the outdoor reading.
+        cooling_considered = (
+            self._attr_target_temperature is not None
+            and current_temp > self._attr_target_temperature + self._plan.primary_threshold
+        )
+        outlook = None
+        if cooling_considered and self._forecast is not None:
+            outlook = self._forecast.outlook(
+                self._weather, self._plan.forecast_horizon, self._plan.forecast_aggregate
+            )
+
+        # The outdoor reading only matters for the cooling gate or the thermal model.
+        outdoor_temp = None
+        if self._outdoor is not None and (learn or predictive or (cooling_considered and outlook is None)):
+            outdoor_temp = self._read_fused(self._outdoor, snapshot)
+        gate_temp = outdoor_temp if outlook is None else outlook
+
+        if learn:
+            self._model.observe(now_ts, current_temp, outdoor_temp, modes)
+
+        # With a lead time, act on where the temperature is heading: start
+        # before the room leaves the band and stop once it will reach the target.
+        decision_temp = current_temp
+        if predictive and self._attr_target_temperature is not None:
+            predicted = self._model.anticipate(
+                current_temp, self._attr_target_temperature, outdoor_temp, modes, self._plan.predictive_lead
+            )
+            decision_temp = min(max(predicted, current_temp - MODEL_MAX_CORRECTION), current_temp + MODEL_MAX_CORRECTION)
+            _LOGGER.debug("Predicted temperature in %s s: %s", self._plan.predictive_lead, predicted)
+
+        decision = decide(
+            decision_temp,
+            gate_temp,
+            self._attr_target_temperature,
+            self._plan.decision_params,
+            previous,
+        )
+        if decision.effective_mode != MODE_COOL:
+            heating = self._tariff_heating(current_temp, snapshot)
+            if heating is not None:
+                # Follow the plan: heat up to the top of the band in planned
+                # slots, and only below the bottom of the band otherwise.
+                margin = self._plan.tariff_margin
+                decision = decide(
+                    decision_temp,
+                    None,
+                    self._attr_target_temperature + (margin if heating else -margin),
+                    self._plan.decision_params,
+                    previous,
+                )
+        effective_mode = decision.effective_mode
+        commands = decision.commands
 
         if self._attr_target_temperature is None:
             _LOGGER.debug("No target temperature set (preset mode None); turning off HVAC devices")
-            if self._last_main_mode != HVACMode.OFF:
-                await self._set_effective_main_hvac_mode(HVACMode.OFF)
-                self._last_main_mode = HVACMode.OFF
-            if self._secondary_climate is not None and self._last_secondary_mode != HVACMode.OFF:
-                await self._set_effective_secondary(HVACMode.OFF)
-                self._last_secondary_mode = HVACMode.OFF
-            return
+        else:
+            if decision.cooling_suppressed:
+                _LOGGER.debug(
+                    "Cooling suppressed: %s temperature (%s) below threshold (%s)",
+                    "outdoor" if outlook is None else "forecast", gate_temp, self._plan.outdoor_hot_threshold
+                )
+            _LOGGER.debug(
+                "Current temp: %s, Target temp: %s, Diff: %s, Effective mode: %s, Primary Threshold: %s, Stage Thresholds: %s",
+                self._attr_current_temperature, self._attr_target_temperature,
+                decision.diff, effective_mode, self._plan.primary_threshold,
+                self._plan.decision_params.stage_thresholds
+            )
+
+        device_commands = []
+        # Devices whose command switches them on or off.
+        switching = set()
+        # Bit 0 is the main device, bit k + 1 stage k; see DecisionTrace.
+        stages_on = sent = held = 0
 
-        now_time = now()
-
-        # Determine effective mode based on the primary threshold.
-        if self._attr_current_temperature < self._attr_target_temperature - self._primary_threshold:
-            effective_mode = HVACMode.HEAT
-            diff = self._attr_target_temperature - self._attr_current_temperature
-
-        elif self._attr_current_temperature > self._attr_target_temperature + self._primary_threshold:
-            diff = self._attr_current_temperature - self._attr_target_temperature
-            effective_mode = HVACMode.OFF
-
-            if self._outdoor_sensor:
-                outdoor_state = self.hass.states.get(self._outdoor_sensor)
-                if outdoor_state is not None and outdoor_state.state not in ["unknown", "unavailable"]:
-                    try:
-                        outdoor_temp = float(outdoor_state.state)
-                    except Exception as e:
-                        _LOGGER.error("Error reading outdoor sensor %s: %s", self._outdoor_sensor, e)
-                        outdoor_temp = None
-                else:
-                    _LOGGER.error("Outdoor sensor %s not found or state is unknown/unavailable", self._outdoor_sensor)
-                    outdoor_temp = None
-
-                if outdoor_temp is not None and outdoor_temp >= self._outdoor_hot_threshold:
-                    effective_mode = HVACMode.COOL
-                else:
-                    _LOGGER.debug(
-                        "Cooling suppressed: outdoor temperature (%s) below threshold (%s)",
-                        outdoor_temp, self._outdoor_hot_threshold
-                    )
+        # Signal main climate device only if a change is required.
+        main_held = decision.send_main_mode and not self._allow_switch(
+            self._main.guard, previous.main_mode, commands.main_mode, now_ts
+        )
+        if main_held:
+            held = 1
+            _LOGGER.debug("Main device switch to %s held back by cycle protection", commands.main_mode)
+            if decision.send_main_temp:
+                # The setpoint is still sent, so it is in place once the switch is allowed.
+                sent = 1
+                device_commands.append(DeviceCommand(self.effective_main_device, None, commands.main_temp))
+        elif decision.send_main_mode or decision.send_main_temp:
+            sent = 1
+            if decision.send_main_mode and _switches(previous.main_mode, commands.main_mode):
+                switching.add(self.effective_main_device)
+            device_commands.append(DeviceCommand(
+                self.effective_main_device,
+                commands.main_mode if decision.send_main_mode else None,
+                commands.main_temp if decision.send_main_temp else None,
+            ))
         else:
-            effective_mode = HVACMode.OFF
-            diff = 0
+            self._metrics.commands_suppressed += 1
+            _LOGGER.debug("Main device state remains unchanged; no update required")
+
+        # Signal every boost stage that needs a change; they are sent together.
+        # Stages only boost the main device: while its switch is held back,
+        # no stage is switched on either.
+        bit = 2
+        for device, last, command, send in zip(
+            self._stages, previous.stages, commands.stages, decision.send_stages
+        ):
+            if command.mode != MODE_OFF:
+                stages_on |= bit
+            if send and main_held and last.mode == MODE_OFF and command.mode != MODE_OFF:
+                held |= bit
+                device.guard.suppressed += 1
+                self._metrics.switches_suppressed += 1
+                _LOGGER.debug("Stage %s held off while the main device switch is held back", device.entity_id)
+            elif send and not self._allow_switch(device.guard, last.mode, command.mode, now_ts):
+                held |= bit
+                _LOGGER.debug("Stage %s switch to %s held back by cycle protection", device.entity_id, command.mode)
+            elif send:
+                sent |= bit
+                if _switches(last.mode, command.mode):
+                    switching.add(device.entity_id)
+                device_commands.append(DeviceCommand(device.entity_id, command.mode, command.temp))
+            else:
+                self._metrics.commands_suppressed += 1
+            bit <<= 1
 
+        self._trace.record(
+            time.time(), current_temp, gate_temp, self._attr_target_temperature,
+            effective_mode, decision.diff, stages_on, sent, held,
+        )
+        self._metrics.commands_sent += len(device_commands)
+        self._async_dispatch(device_commands, switching)
+
+    def _tariff_heating(self, current_temp, snapshot):
+        """Return whether the tariff plan heats now, or None without a plan."""
+        if (
+            self._price_sensor is None
+            or self._attr_target_temperature is None
+            or self._model.samples < MODEL_MIN_SAMPLES
+        ):
+            return None
+        now = time.time()
+        state = self.hass.states.get(self._price_sensor)
+        key = (state.last_updated if state is not None else None, self._attr_target_temperature, self._plan.tariff_margin)
+        if key != self._tariff_key:
+            self._tariff_key = key
+            self._tariff_plan = self._plan_tariff(state, current_temp, snapshot, now)
+        return self._tariff_plan.heating_at(now) if self._tariff_plan is not None else None
+
+    def _plan_tariff(self, state, current_temp, snapshot, now):
+        """Plan heating with the main device over the price slots of ``state``."""
+        from .tariff import parse_prices, plan_heating  # Only needed with a price sensor.
+
+        prices = parse_prices(state, now)
+        if prices is None:
+            _LOGGER.debug("No prices available from %s; not planning", self._price_sensor)
+            return None
+        outdoor_temp = self._read_fused(self._outdoor, snapshot) if self._outdoor is not None else None
+        off = [MODE_OFF] * len(self._devices)
+        rate_off = self._linear_rate(outdoor_temp, off)
+        rate_on = self._linear_rate(outdoor_temp, [MODE_HEAT, *off[1:]])
+        if rate_on[0] <= rate_off[0]:
+            _LOGGER.debug("No heating gain learned yet; not planning")
+            return None
+        started = time.perf_counter()
+        target = self._attr_target_temperature
+        margin = self._plan.tariff_margin
+        plan = plan_heating(*prices, current_temp, target - margin, target + margin, rate_off, rate_on)
         _LOGGER.debug(
-            "Current temp: %s, Target temp: %s, Diff: %s, Effective mode: %s, Primary Threshold: %s, Secondary Threshold: %s",
-            self._attr_current_temperature, self._attr_target_temperature,
-            diff, effective_mode, self._primary_threshold, self._secondary_threshold
+            "Planned heating in %s of %s price slots in %.2f ms",
+            sum(plan.heating), len(plan.heating), (time.perf_counter() - started) * 1000,
         )
+        return plan
 
-        # Signal main climate device only if a change is required.
-        if effective_mode != self._last_main_mode:
-            await self._set_effective_main_hvac_mode(effective_mode)
-            self._last_main_mode = effective_mode
-        else:
-            _LOGGER.debug("Main device HVAC mode remains %s; no update required", effective_mode)
-
-        if effective_mode != HVACMode.OFF and self._attr_target_temperature is not None:
-            # Apply the primary offset here.
-            main_target = self._attr_target_temperature + self._primary_offset
-            if self._last_main_temp != main_target:
-                await self._set_effective_main_temperature(main_target)
-                self._last_main_temp = main_target
-            else:
-                _LOGGER.debug("Main device temperature remains %s; no update required", main_target)
-
-        # Signal secondary device only if configured and a change is required.
-        if self._secondary_climate is not None:
-            secondary_effective_mode = effective_mode if diff > self._secondary_threshold else HVACMode.OFF
-            # Apply the secondary offset here.
-            secondary_temp = (self._attr_target_temperature + self._secondary_offset) if secondary_effective_mode != HVACMode.OFF else None
-            if (secondary_effective_mode != self._last_secondary_mode) or (secondary_temp != self._last_secondary_temp):
-                await self._set_effective_secondary(secondary_effective_mode, secondary_temp)
-                self._last_secondary_mode = secondary_effective_mode
-                self._last_secondary_temp = secondary_temp
+    def _linear_rate(self, outdoor_temp, modes):
+        """Return (intercept, slope) of the model's rate as a function of the indoor temperature."""
+        intercept = self._model.rate(0.0, outdoor_temp, modes)
+        return intercept, self._model.rate(1.0, outdoor_temp, modes) - intercept
+
+    @property
+    def decision_trace(self):
+        """Return the trace of recent decisions."""
+        return self._trace
+
+    @property
+    def tariff_plan(self):
+        """Return the current heating plan, or None."""
+        return self._tariff_plan
+
+    def _allow_switch(self, guard, previous_mode, mode, now_ts):
+        """Check a mode change against the cycle guard.
+
+        Switches are only recorded once the device confirmed them, so a
+        command that failed does not use up the runtime or switch budget.
+        """
+        if not guard.allow(previous_mode != HVACMode.OFF, mode != HVACMode.OFF, now_ts):
+            self._metrics.switches_suppressed += 1
+            return False
+        return True
+
+    @property
+    def suppressed_switches(self):
+        """Return how many device switches the cycle protection held back."""
+        return sum(device.guard.suppressed for device in self._devices.values())
+
+    @callback
+    def _async_dispatch(self, device_commands, switching=frozenset()):
+        """Queue the commands; each device has its own queue, so they run concurrently.
+
+        ``switching`` holds the devices whose command switches them on or
+        off; the switch is recorded in their cycle guard once confirmed.
+        """
+        for command in device_commands:
+            device = self._devices[command.entity_id]
+            switched = command.entity_id in switching
+            if device is self._main:
+                device.queue.async_submit(command, partial(self._async_main_confirmed, switched))
             else:
-                _LOGGER.debug("Secondary device state remains unchanged; no update required")
+                device.queue.async_submit(command, partial(self._async_stage_confirmed, device, switched))
+
+    @callback
+    def _async_main_confirmed(self, switched, command):
+        """Update the main device cache once the device accepted a command."""
+        if command.hvac_mode is not None:
+            self._main.mode = HVACMode(command.hvac_mode)
+        if command.temperature is not None:
+            self._main.temperature = command.temperature
+        self._main.confirmed_at = self._clock()
+        if switched:
+            self._main.guard.record_switch(self._main.confirmed_at)
+
+    @callback
+    def _async_stage_confirmed(self, device, switched, command):
+        """Update the cache of a boost device once the device accepted a command."""
+        device.mode = HVACMode(command.hvac_mode)
+        device.temperature = command.temperature
+        device.confirmed_at = self._clock()
+        if switched:
+            device.guard.record_switch(device.confirmed_at)
+
+    def _previous_commands(self):
+        """Return the device state the desired commands are compared against.
+
+        The live state of the devices is used, so manual changes and
+        restarts are detected. Right after a confirmed command the cache is
+        trusted instead, as devices may take a while to report their new state.
+        """
+        main_mode, main_temp = self._observed_device(self._main)
+        stages = []
+        for device in self._stages:
+            mode, temperature = self._observed_device(device)
+            # The setpoint of a device that is off does not matter.
+            stages.append(StageCommand(mode, temperature if mode != HVACMode.OFF else None))
+        return Commands(main_mode, main_temp, tuple(stages))
+
+    def _observed_device(self, device):
+        """Return the (mode, temperature) of a device, preferring its live state."""
+        cached_mode, cached_temp = device.mode, device.temperature
+        if device.confirmed_at is not None and self._clock() - device.confirmed_at < RECONCILE_GRACE_SECONDS:
+            return cached_mode, cached_temp
+        state = self.hass.states.get(device.entity_id)
+        if state is None or state.state in UNAVAILABLE_STATES:
+            return cached_mode, cached_temp
+        temperature = state.attributes.get("temperature")
+        if (
+            temperature is not None
+            and cached_temp is not None
+            and abs(temperature - cached_temp) < RECONCILE_TEMPERATURE_TOLERANCE
+        ):
+            # The device rounded the setpoint we sent.
+            temperature = cached_temp
+        return state.state, temperature
 
-        if effective_mode != HVACMode.OFF:
-            self._last_switch_time = now_time
+    @property
+    def extra_restore_state_data(self):
+        """Return the confirmed commands and the thermal model so they survive a restart."""
+        return SmartClimateExtraStoredData(
+            Commands(
+                self._main.mode,
+                self._main.temperature,
+                tuple(StageCommand(device.mode, device.temperature) for device in self._stages),
+            ),
+            self._model.as_dict(),
+        )
 
-    async def _set_effective_main_temperature(self, temperature):
-        service_data = {
-            "entity_id": self.effective_main_device,
-            "temperature": temperature,
-        }
-        _LOGGER.debug("Setting main device %s to temperature %s", self.effective_main_device, temperature)
-        await self.hass.services.async_call("climate", "set_temperature", service_data)
+    @property
+    def thermal_model(self):
+        """Return the learned thermal model of the zone."""
+        return self._model
 
-    async def _set_effective_main_hvac_mode(self, hvac_mode):
-        service_data = {
-            "entity_id": self.effective_main_device,
-            "hvac_mode": hvac_mode,
-        }
-        _LOGGER.debug("Setting main device %s to hvac_mode %s", self.effective_main_device, hvac_mode)
-        await self.hass.services.async_call("climate", "set_hvac_mode", service_data)
+    async def _async_warm_start(self, restored_model):
+        """Replay the recorder history into the thermal model and the cycle guards.
+
+        Runs in the background; the entity controls its devices meanwhile.
+        A restored model is kept, so only the last hour is needed for the
+        cycle guards then.
+        """
+        from .warm_start import async_replay_history  # Pulls in the recorder.
 
-    async def _set_effective_secondary(self, hvac_mode, temperature=None):
-        if self._secondary_climate is None:
-            _LOGGER.debug("No secondary device configured, skipping secondary update")
+        days = self._plan.warm_start_days
+        start = dt_util.utcnow() - (timedelta(hours=1) if restored_model else timedelta(days=days))
+        started = time.monotonic()
+        try:
+            replay = await async_replay_history(
+                self.hass, self._sensors, self._outdoor_sensors, self.devices, self._plan, start
+            )
+        except Exception as err:  # the history is a nice-to-have, never fatal
+            _LOGGER.warning("Warm start of %s from the recorder failed: %s", self.entity_id, err)
+            return
+        if replay is None:
             return
-        if hvac_mode != HVACMode.OFF and temperature is not None:
-            service_data_temp = {
-                "entity_id": self.effective_secondary_device,
-                "temperature": temperature,
-            }
-            _LOGGER.debug("Setting secondary device %s to target temperature %s", self.effective_secondary_device, temperature)
-            await self.hass.services.async_call("climate", "set_temperature", service_data_temp)
-        service_data_mode = {
-            "entity_id": self.effective_secondary_device,
-            "hvac_mode": hvac_mode,
-        }
-        _LOGGER.debug("Setting secondary device %s to hvac_mode %s", self.effective_secondary_device, hvac_mode)
-        await self.hass.services.async_call("climate", "set_hvac_mode", service_data_mode)
 
-    async def async_update(self):
-        sensor_state = self.hass.states.get(self._sensor)
-        if sensor_state is not None and sensor_state.state not in ["unknown", "unavailable"]:
-            try:
-                self._attr_current_temperature = float(sensor_state.state)
-            except Exception as e:
-                _LOGGER.error("Error updating sensor %s: %s", self._sensor, e)
+        # History timestamps are wall clock, the controller uses its own clock.
+        offset = self._clock() - time.time()
+        if replay.model.samples > self._model.samples:
+            replay.model.rebase(offset)
+            self._model = replay.model
+        for entity_id, switches in replay.switches.items():
+            guard = self._devices[entity_id].guard
+            if guard.last_switch is None:
+                for switched_at in switches[-max(guard.max_switches_per_hour, 1):]:
+                    guard.record_switch(switched_at + offset)
+        _LOGGER.debug(
+            "Warm start of %s replayed %s rows in %.1fs; thermal model has %s samples",
+            self.entity_id, replay.rows, time.monotonic() - started, self._model.samples,
+        )
+
+    async def async_join_commands(self):
+        """Wait until all queued device commands have been handled."""
+        for device in self._devices.values():
+            await device.queue.async_join()
+
+    def _read_sensor(self, entity_id, snapshot=None):
+        """Return a (value, reported_at) reading from the snapshot, or from the state machine."""
+        if snapshot is not None and entity_id in snapshot:
+            reading = snapshot[entity_id]
         else:
-            _LOGGER.error("Sensor %s state is unknown or unavailable during update", self._sensor)
+            reading = read_temperature(self.hass, entity_id)
+        if reading is None:
+            self._metrics.sensor_failures += 1
+        return reading
+
+    def _create_fusion(self, sensors):
+        """Return a SensorFusion for ``sensors`` using the plan's settings."""
+        plan = self._plan
+        return SensorFusion(
+            sensors, plan.sensor_fusion, plan.sensor_window, plan.sensor_ema_alpha, self._sensor_max_age(sensors)
+        )
+
+    def _sensor_max_age(self, sensors):
+        """Return the maximum sensor age to apply to ``sensors``, 0 for none.
+
+        Without ``last_reported`` an unchanged reading looks as old as its
+        last change, so a single sensor is never aged out: that would stop a
+        zone whose temperature is simply steady.
+        """
+        if len(sensors) > 1 or LAST_REPORTED_SUPPORTED:
+            return self._plan.sensor_max_age
+        return 0
+
+    def _read_fused(self, fusion, snapshot=None):
+        """Read every sensor of ``fusion`` and return the fused value.
+
+        A reading is as old as the last report of its sensor, so a sensor
+        that stopped reporting but kept its state is left out once that is
+        older than the maximum sensor age.
+        """
+        now_ts = self._clock()
+        now_wall = time.time()
+        for entity_id in fusion.entity_ids:
+            reading = self._read_sensor(entity_id, snapshot)
+            if reading is not None:
+                value, reported = reading
+                # Ages are kept on the entity's clock.
+                fusion.add(entity_id, value, now_ts - max(now_wall - reported, 0.0))
+        return fusion.value(now_ts)
+
+    async def async_update(self):
+        """Run a full update when one is requested, e.g. by homeassistant.update_entity."""
+        await self._async_run_update()
 
     async def async_added_to_hass(self):
-        """Restore preset and target temperature on startup, then start periodic updates."""
+        """Start the entity once Home Assistant has started.
+
+        Restoring, subscribing and the first update are deferred, so setting
+        up many entries does not hold up the boot.
+        """
         await super().async_added_to_hass()
+        self._start_unsub = async_at_started(self.hass, self._async_hass_started)
+
+    async def _async_hass_started(self, hass):
+        """Restore preset and target temperature, then start listening for sensor changes."""
+        self._start_unsub = None
         last_state = await self.async_get_last_state()
+        override_until = None
         if last_state:
             self._attr_preset_mode = last_state.attributes.get("preset_mode", "eco")
             self._attr_target_temperature = last_state.attributes.get("target_temperature", self._attr_target_temperature)
+            override_until = dt_util.parse_datetime(last_state.attributes.get("preset_override_until") or "")
             _LOGGER.debug("Restored state: preset_mode=%s, target_temperature=%s", self._attr_preset_mode, self._attr_target_temperature)
-        self._update_unsub = async_track_time_interval(
-            self.hass, self._periodic_update, timedelta(seconds=60)
+        if self._plan.schedule is not None:
+            # A manual override survives a restart, but not its slot.
+            if override_until is not None and override_until > dt_util.now():
+                self._override_until = override_until
+            else:
+                self._select_preset(self._plan.schedule.active_preset(dt_util.now()))
+            self._async_arm_schedule()
+        extra_data = await self.async_get_last_extra_data()
+        restored = SmartClimateExtraStoredData.from_dict(extra_data.as_dict()) if extra_data else None
+        if restored is not None:
+            commands = restored.commands
+            self._main.mode = commands.main_mode
+            self._main.temperature = commands.main_temp
+            for device, stage in zip(self._stages, commands.stages):
+                device.mode, device.temperature = stage
+            model = ThermalModel.from_dict(restored.model, self.devices) if restored.model else None
+            if model is not None:
+                self._model = model
+                _LOGGER.debug("Restored thermal model after %s samples", model.samples)
+            _LOGGER.debug("Restored last commands: %s", commands)
+        if self._plan.warm_start_days:
+            self._warm_start_task = self.hass.async_create_background_task(
+                self._async_warm_start(self._model.samples > 0), f"{self.entity_id} warm start"
+            )
+        self._debouncer = Debouncer(
+            self.hass,
+            _LOGGER,
+            cooldown=self._plan.debounce_seconds,
+            immediate=False,
+            function=self._async_run_update,
+        )
+        self._state_unsub = async_track_state_change_event(
+            self.hass, list(self._tracked_sensors), self._async_sensor_changed
         )
+        if self._weather:
+            self._forecast = async_get_forecast_cache(self.hass)
+        # The shared coordinator runs a slow safety-net update for all entities.
+        self._update_unsub = async_get_coordinator(self.hass).async_add_entity(self)
+        await self._async_run_update()
 
     async def async_will_remove_from_hass(self):
+        if self._start_unsub:
+            self._start_unsub()
+            self._start_unsub = None
+        if self._state_unsub:
+            self._state_unsub()
+            self._state_unsub = None
         if self._update_unsub:
             self._update_unsub()
             self._update_unsub = None
+        if self._debouncer:
+            self._debouncer.async_cancel()
+            self._debouncer = None
+        if self._warm_start_task:
+            self._warm_start_task.cancel()
+            self._warm_start_task = None
+        if self._schedule_unsub:
+            self._schedule_unsub()
+            self._schedule_unsub = None
+        for device in self._devices.values():
+            device.queue.async_cancel()
+
+    @callback
+    def _async_sensor_changed(self, event):
+        """Schedule a debounced update when a tracked sensor reports a new value."""
+        new_state = event.data.get("new_state")
+        if new_state is None or new_state.state in ["unknown", "unavailable"]:
+            return
+        old_state = event.data.get("old_state")
+        if old_state is not None and old_state.state == new_state.state:
+            return
+        self._debouncer.async_schedule_call()
+
+    async def async_handle_snapshot(self, snapshot):
+        """Run a periodic update with sensor readings parsed by the coordinator."""
+        await self._async_run_update(snapshot)
+
+    @property
+    def metrics(self):
+        """Return the performance counters of this entity."""
+        return self._metrics
 
-    async def _periodic_update(self, now_time):
-        await self._apply_temperature()
+    @property
+    def coalesced_updates(self):
+        """Return how often an update arrived while another one was still running."""
+        return self._metrics.updates_coalesced
+
+    @callback
+    def _async_publish_state(self):
+        """Write the state if it changed beyond the deadband or the heartbeat is due."""
+        now_ts = self._clock()
+        current = self._attr_current_temperature
+        snapshot = (
+            self._attr_target_temperature,
+            self._attr_preset_mode,
+            self._attr_hvac_mode,
+            self._schedule_next,
+            self._override_until,
+        )
+        published = self._published
+        if (
+            published is not None
+            and published[1:] == snapshot
+            and now_ts - self._published_at < self._plan.publish_heartbeat
+            and (
+                current == published[0]
+                or (
+                    current is not None
+                    and published[0] is not None
+                    and abs(current - published[0]) < self._plan.publish_deadband
+                )
+            )
+        ):
+            self._metrics.state_writes_skipped += 1
+            return
+        self._published = (current, *snapshot)
+        self._published_at = now_ts
         self.async_write_ha_state()
+
+    async def _async_run_update(self, snapshot=None):
+        """Apply the temperature and write the state, one run at a time.
+
+        An update requested while a previous one is still awaiting a device
+        is not run concurrently; instead one more run is done afterwards, so
+        the command caches are never updated by two runs at once.
+        """
+        if self._update_in_flight:
+            self._update_pending = True
+            self._metrics.updates_coalesced += 1
+            return
+
+        self._update_in_flight = True
+        try:
+            while True:
+                self._update_pending = False
+                started = time.perf_counter()
+                await self._apply_temperature(snapshot)
+                self._metrics.apply_duration.observe(time.perf_counter() - started)
+                self._metrics.updates += 1
+                self._async_publish_state()
+                if not self._update_pending:
+                    break
+                # The coalesced run reads fresh sensor states.
+                snapshot = None
+        finally:
+            self._update_in_flight = False
@@ -0,0 +1,122 @@
+"""Background command queue for a single climate device."""
+import asyncio
+import logging
+
+from homeassistant.core import callback
+
+from .const import COMMAND_BACKOFF_SECONDS, COMMAND_RETRIES, COMMAND_TIMEOUT_SECONDS
+from .dispatch import async_send_command
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DeviceCommandQueue:
+    """Send commands to one device without blocking the control loop.
+
+    Only the newest command waits in the queue: submitting a command
+    replaces a queued one that has not started yet (last write wins). Each
+    command is sent with a timeout and retried with exponential backoff;
+    ``on_success`` is only called once the device accepted the command, so
+    callers can keep their caches in line with what the device really got.
+    """
+
+    def __init__(
+        self,
+        hass,
+        entity_id,
+        merge=False,
+        timeout=COMMAND_TIMEOUT_SECONDS,
+        retries=COMMAND_RETRIES,
+        backoff=COMMAND_BACKOFF_SECONDS,
+        metrics=None,
+    ):
+        self.hass = hass
+        self.entity_id = entity_id
+        self.merge = merge
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._metrics = metrics
+        self._pending = None
+        self._current = None
+        self._task = None
+
+    @property
+    def busy(self):
+        """Return True while a command is being sent or waiting to be sent."""
+        return self._task is not None and not self._task.done()
+
+    @callback
+    def async_submit(self, command, on_success=None):
+        """Queue a command, replacing any queued command that has not started."""
+        if self._pending is None and command == self._current and self.busy:
+            # The same command is already on its way.
+            return
+        if self._pending is not None and self._pending[0] != command:
+            _LOGGER.debug("Replacing queued command for %s with %s", self.entity_id, command)
+        self._pending = (command, on_success)
+        if not self.busy:
+            self._task = self.hass.async_create_task(self._async_run())
+
+    async def async_join(self):
+        """Wait until all queued commands have been handled."""
+        while self.busy:
+            await asyncio.shield(self._task)
+
+    @callback
+    def async_cancel(self):
+        """Drop the queued command and stop sending the current one."""
+        self._pending = None
+        if self.busy:
+            self._task.cancel()
+        self._task = None
+
+    async def _async_run(self):
+        while self._pending is not None:
+            command, on_success = self._pending
+            self._pending = None
+            self._current = command
+            try:
+                if await self._async_send_with_retries(command) and on_success is not None:
+                    on_success(command)
+            finally:
+                self._current = None
+
+    async def _async_send_with_retries(self, command):
+        """Send a command and return True once the device accepted it."""
+        attempt = 0
+        while True:
+            try:
+                async with asyncio.timeout(self._timeout):
+                    await async_send_command(
+                        self.hass,
+                        command,
+                        self.merge,
+                        self._metrics.service_call_duration if self._metrics else None,
+                    )
+                return True
+            except Exception as e:
+                error = e
+
+            if self._metrics is not None:
+                self._metrics.commands_failed += 1
+            if self._pending is not None:
+                # A newer command supersedes this one; do not retry it.
+                _LOGGER.debug("Dropping failed command for %s: %s", self.entity_id, str(error) or "timeout")
+                return False
+            if attempt >= self._retries:
+                _LOGGER.error(
+                    "Giving up on command %s for %s after %s attempts: %s",
+                    command, self.entity_id, attempt + 1, str(error) or "timeout",
+                )
+                return False
+
+            delay = self._backoff * 2 ** attempt
+            attempt += 1
+            _LOGGER.warning(
+                "Command for %s failed (%s); retrying in %s seconds",
+                self.entity_id, str(error) or "timeout", delay,
+            )
+            await asyncio.sleep(delay)
+            if self._pending is not None:
+                return False
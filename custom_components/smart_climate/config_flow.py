@@ -12,17 +12,51 @@ from .const import (
     CONF_SECONDARY_CLIMATE,
     CONF_SENSOR,
     CONF_OUTDOOR_SENSOR,
+    CONF_WEATHER,
+    CONF_PRICE_SENSOR,
+    CONF_TARIFF_COMFORT_MARGIN,
+    CONF_FORECAST_AGGREGATE,
+    CONF_FORECAST_HORIZON_HOURS,
     CONF_TEMP_THRESHOLD_PRIMARY,
     CONF_TEMP_THRESHOLD_SECONDARY,
     CONF_OUTDOOR_HOT_THRESHOLD,
     CONF_PRIMARY_OFFSET,
     CONF_SECONDARY_OFFSET,
+    CONF_DEBOUNCE_SECONDS,
+    CONF_MERGE_COMMANDS,
+    CONF_MIN_RUNTIME_SECONDS,
+    CONF_MIN_OFF_SECONDS,
+    CONF_MAX_SWITCHES_PER_HOUR,
+    CONF_PUBLISH_DEADBAND,
+    CONF_PUBLISH_HEARTBEAT_SECONDS,
+    CONF_SENSOR_FUSION,
+    CONF_SENSOR_MAX_AGE_SECONDS,
+    CONF_PREDICTIVE_LEAD_SECONDS,
+    CONF_WARM_START_DAYS,
     DEFAULT_TEMP_THRESHOLD_PRIMARY,
     DEFAULT_TEMP_THRESHOLD_SECONDARY,
     DEFAULT_OUTDOOR_HOT_THRESHOLD,
     DEFAULT_PRIMARY_OFFSET,
-    DEFAULT_SECONDARY_OFFSET
+    DEFAULT_SECONDARY_OFFSET,
+    DEFAULT_DEBOUNCE_SECONDS,
+    DEFAULT_MERGE_COMMANDS,
+    DEFAULT_MIN_RUNTIME_SECONDS,
+    DEFAULT_MIN_OFF_SECONDS,
+    DEFAULT_MAX_SWITCHES_PER_HOUR,
+    DEFAULT_PUBLISH_DEADBAND,
+    DEFAULT_PUBLISH_HEARTBEAT_SECONDS,
+    DEFAULT_SENSOR_FUSION,
+    DEFAULT_FORECAST_AGGREGATE,
+    DEFAULT_FORECAST_HORIZON_HOURS,
+    DEFAULT_TARIFF_COMFORT_MARGIN,
+    DEFAULT_SENSOR_MAX_AGE_SECONDS,
+    DEFAULT_PREDICTIVE_LEAD_SECONDS,
+    DEFAULT_WARM_START_DAYS,
 )
+from . import entry_config
+from .forecast import FORECAST_AGGREGATES
+from .fusion import FUSION_STRATEGIES
+from .plan import config_sensors
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -37,20 +71,36 @@ class SmartClimateOptionsFlow(config_entries.OptionsFlow):
         if user_input is not None:
             return self.async_create_entry(data=user_input)
 
-        # Fetch the current options
-        current_options = self.config_entry.options
+        # Options are applied over the entry data, so both provide the current values.
+        current_options = entry_config(self.config_entry)
 
         # Build a dynamic schema using the current values as defaults.
         data_schema = vol.Schema({
             vol.Required(CONF_MAIN_CLIMATE, default=current_options.get(CONF_MAIN_CLIMATE)): selector({"entity": {"domain": "climate"}}),
             vol.Optional(CONF_SECONDARY_CLIMATE, default=current_options.get(CONF_SECONDARY_CLIMATE)): selector({"entity": {"domain": "climate"}}),
-            vol.Required(CONF_SENSOR, default=current_options.get(CONF_SENSOR)): selector({"entity": {"domain": ["sensor"]}}),
-            vol.Optional(CONF_OUTDOOR_SENSOR, default=current_options.get(CONF_OUTDOOR_SENSOR)): selector({"entity": {"domain": ["sensor"]}}),
+            vol.Required(CONF_SENSOR, default=list(config_sensors(current_options, CONF_SENSOR))): selector({"entity": {"domain": ["sensor"], "multiple": True}}),
+            vol.Optional(CONF_OUTDOOR_SENSOR, default=list(config_sensors(current_options, CONF_OUTDOOR_SENSOR))): selector({"entity": {"domain": ["sensor"], "multiple": True}}),
+            vol.Optional(CONF_WEATHER, default=current_options.get(CONF_WEATHER)): selector({"entity": {"domain": "weather"}}),
+            vol.Optional(CONF_FORECAST_HORIZON_HOURS, default=current_options.get(CONF_FORECAST_HORIZON_HOURS, DEFAULT_FORECAST_HORIZON_HOURS)): vol.Coerce(float),
+            vol.Optional(CONF_FORECAST_AGGREGATE, default=current_options.get(CONF_FORECAST_AGGREGATE, DEFAULT_FORECAST_AGGREGATE)): vol.In(FORECAST_AGGREGATES),
+            vol.Optional(CONF_PRICE_SENSOR, default=current_options.get(CONF_PRICE_SENSOR)): selector({"entity": {"domain": "sensor"}}),
+            vol.Optional(CONF_TARIFF_COMFORT_MARGIN, default=current_options.get(CONF_TARIFF_COMFORT_MARGIN, DEFAULT_TARIFF_COMFORT_MARGIN)): vol.Coerce(float),
+            vol.Optional(CONF_SENSOR_FUSION, default=current_options.get(CONF_SENSOR_FUSION, DEFAULT_SENSOR_FUSION)): vol.In(FUSION_STRATEGIES),
+            vol.Optional(CONF_SENSOR_MAX_AGE_SECONDS, default=current_options.get(CONF_SENSOR_MAX_AGE_SECONDS, DEFAULT_SENSOR_MAX_AGE_SECONDS)): vol.Coerce(float),
             vol.Optional(CONF_TEMP_THRESHOLD_PRIMARY, default=current_options.get(CONF_TEMP_THRESHOLD_PRIMARY, DEFAULT_TEMP_THRESHOLD_PRIMARY)): vol.Coerce(float),
             vol.Optional(CONF_TEMP_THRESHOLD_SECONDARY, default=current_options.get(CONF_TEMP_THRESHOLD_SECONDARY, DEFAULT_TEMP_THRESHOLD_SECONDARY)): vol.Coerce(float),
             vol.Optional(CONF_OUTDOOR_HOT_THRESHOLD, default=current_options.get(CONF_OUTDOOR_HOT_THRESHOLD, DEFAULT_OUTDOOR_HOT_THRESHOLD)): vol.Coerce(float),
             vol.Optional(CONF_PRIMARY_OFFSET, default=current_options.get(CONF_PRIMARY_OFFSET, DEFAULT_PRIMARY_OFFSET)): vol.Coerce(float),
             vol.Optional(CONF_SECONDARY_OFFSET, default=current_options.get(CONF_SECONDARY_OFFSET, DEFAULT_SECONDARY_OFFSET)): vol.Coerce(float),
+            vol.Optional(CONF_DEBOUNCE_SECONDS, default=current_options.get(CONF_DEBOUNCE_SECONDS, DEFAULT_DEBOUNCE_SECONDS)): vol.Coerce(float),
+            vol.Optional(CONF_MERGE_COMMANDS, default=current_options.get(CONF_MERGE_COMMANDS, DEFAULT_MERGE_COMMANDS)): bool,
+            vol.Optional(CONF_MIN_RUNTIME_SECONDS, default=current_options.get(CONF_MIN_RUNTIME_SECONDS, DEFAULT_MIN_RUNTIME_SECONDS)): vol.Coerce(float),
+            vol.Optional(CONF_MIN_OFF_SECONDS, default=current_options.get(CONF_MIN_OFF_SECONDS, DEFAULT_MIN_OFF_SECONDS)): vol.Coerce(float),
+            vol.Optional(CONF_MAX_SWITCHES_PER_HOUR, default=current_options.get(CONF_MAX_SWITCHES_PER_HOUR, DEFAULT_MAX_SWITCHES_PER_HOUR)): vol.Coerce(int),
+            vol.Optional(CONF_PUBLISH_DEADBAND, default=current_options.get(CONF_PUBLISH_DEADBAND, DEFAULT_PUBLISH_DEADBAND)): vol.Coerce(float),
+            vol.Optional(CONF_PUBLISH_HEARTBEAT_SECONDS, default=current_options.get(CONF_PUBLISH_HEARTBEAT_SECONDS, DEFAULT_PUBLISH_HEARTBEAT_SECONDS)): vol.Coerce(float),
+            vol.Optional(CONF_PREDICTIVE_LEAD_SECONDS, default=current_options.get(CONF_PREDICTIVE_LEAD_SECONDS, DEFAULT_PREDICTIVE_LEAD_SECONDS)): vol.Coerce(float),
+            vol.Optional(CONF_WARM_START_DAYS, default=current_options.get(CONF_WARM_START_DAYS, DEFAULT_WARM_START_DAYS)): vol.Coerce(float),
         })
 
         return self.async_show_form(step_id="init", data_schema=data_schema)
@@ -69,13 +119,29 @@ class SmartClimateConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         data_schema = vol.Schema({
             vol.Required(CONF_MAIN_CLIMATE): selector({"entity": {"domain": "climate"}}),
             vol.Optional(CONF_SECONDARY_CLIMATE): selector({"entity": {"domain": "climate"}}),
-            vol.Required(CONF_SENSOR): selector({"entity": {"domain": ["sensor"]}}),
-            vol.Optional(CONF_OUTDOOR_SENSOR): selector({"entity": {"domain": ["sensor"]}}),
+            vol.Required(CONF_SENSOR): selector({"entity": {"domain": ["sensor"], "multiple": True}}),
+            vol.Optional(CONF_OUTDOOR_SENSOR): selector({"entity": {"domain": ["sensor"], "multiple": True}}),
+            vol.Optional(CONF_WEATHER): selector({"entity": {"domain": "weather"}}),
+            vol.Optional(CONF_FORECAST_HORIZON_HOURS, default=DEFAULT_FORECAST_HORIZON_HOURS): vol.Coerce(float),
+            vol.Optional(CONF_FORECAST_AGGREGATE, default=DEFAULT_FORECAST_AGGREGATE): vol.In(FORECAST_AGGREGATES),
+            vol.Optional(CONF_PRICE_SENSOR): selector({"entity": {"domain": "sensor"}}),
+            vol.Optional(CONF_TARIFF_COMFORT_MARGIN, default=DEFAULT_TARIFF_COMFORT_MARGIN): vol.Coerce(float),
+            vol.Optional(CONF_SENSOR_FUSION, default=DEFAULT_SENSOR_FUSION): vol.In(FUSION_STRATEGIES),
+            vol.Optional(CONF_SENSOR_MAX_AGE_SECONDS, default=DEFAULT_SENSOR_MAX_AGE_SECONDS): vol.Coerce(float),
             vol.Optional(CONF_TEMP_THRESHOLD_PRIMARY, default=DEFAULT_TEMP_THRESHOLD_PRIMARY): vol.Coerce(float),
             vol.Optional(CONF_TEMP_THRESHOLD_SECONDARY, default=DEFAULT_TEMP_THRESHOLD_SECONDARY): vol.Coerce(float),
             vol.Optional(CONF_OUTDOOR_HOT_THRESHOLD, default=DEFAULT_OUTDOOR_HOT_THRESHOLD): vol.Coerce(float),
             vol.Optional(CONF_PRIMARY_OFFSET, default=DEFAULT_PRIMARY_OFFSET): vol.Coerce(float),
             vol.Optional(CONF_SECONDARY_OFFSET, default=DEFAULT_SECONDARY_OFFSET): vol.Coerce(float),
+            vol.Optional(CONF_DEBOUNCE_SECONDS, default=DEFAULT_DEBOUNCE_SECONDS): vol.Coerce(float),
+            vol.Optional(CONF_MERGE_COMMANDS, default=DEFAULT_MERGE_COMMANDS): bool,
+            vol.Optional(CONF_MIN_RUNTIME_SECONDS, default=DEFAULT_MIN_RUNTIME_SECONDS): vol.Coerce(float),
+            vol.Optional(CONF_MIN_OFF_SECONDS, default=DEFAULT_MIN_OFF_SECONDS): vol.Coerce(float),
+            vol.Optional(CONF_MAX_SWITCHES_PER_HOUR, default=DEFAULT_MAX_SWITCHES_PER_HOUR): vol.Coerce(int),
+            vol.Optional(CONF_PUBLISH_DEADBAND, default=DEFAULT_PUBLISH_DEADBAND): vol.Coerce(float),
+            vol.Optional(CONF_PUBLISH_HEARTBEAT_SECONDS, default=DEFAULT_PUBLISH_HEARTBEAT_SECONDS): vol.Coerce(float),
+            vol.Optional(CONF_PREDICTIVE_LEAD_SECONDS, default=DEFAULT_PREDICTIVE_LEAD_SECONDS): vol.Coerce(float),
+            vol.Optional(CONF_WARM_START_DAYS, default=DEFAULT_WARM_START_DAYS): vol.Coerce(float),
         })
         return self.async_show_form(
             step_id="user",
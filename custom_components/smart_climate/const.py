@@ -1,13 +1,45 @@
 DOMAIN = "smart_climate"  # Renamed from dual_thermostat
 
+# Keys in hass.data[DOMAIN] and in the per config entry data stored there.
+DATA_COORDINATOR = "coordinator"
+DATA_METRICS = "metrics"
+DATA_ENTITY = "entity"
+DATA_FORECAST = "forecast"
+
 # Configuration keys for the main and secondary climate devices.
 CONF_MAIN_CLIMATE = "main_climate"
 CONF_SECONDARY_CLIMATE = "secondary_climate"
 
-# Configuration keys for sensors.
+# Boost stages: a list of devices, each with its own threshold, offset and
+# allowed modes. A configured secondary_climate is the first stage.
+CONF_STAGES = "stages"
+CONF_STAGE_CLIMATE = "climate"
+CONF_STAGE_THRESHOLD = "threshold"
+CONF_STAGE_OFFSET = "offset"
+CONF_STAGE_MODES = "modes"
+STAGE_MODES = ["heat", "cool"]
+
+# Configuration keys for sensors; both accept one sensor or a list.
 CONF_SENSOR = "sensor"  # Primary indoor sensor.
 CONF_OUTDOOR_SENSOR = "outdoor_sensor"  # (Optional) Outdoor sensor.
 
+# Several sensors are fused into one reading with this strategy.
+CONF_SENSOR_FUSION = "sensor_fusion"
+CONF_SENSOR_WINDOW = "sensor_window"  # Readings averaged per sensor.
+CONF_SENSOR_EMA_ALPHA = "sensor_ema_alpha"
+CONF_SENSOR_MAX_AGE_SECONDS = "sensor_max_age_seconds"
+
+# (Optional) Weather entity; its hourly forecast over the horizon, as a mean
+# or peak, decides whether cooling is allowed instead of the outdoor sensor.
+CONF_WEATHER = "weather"
+CONF_FORECAST_HORIZON_HOURS = "forecast_horizon_hours"
+CONF_FORECAST_AGGREGATE = "forecast_aggregate"
+
+# (Optional) Sensor with the prices of a dynamic tariff; heating is planned
+# in the cheapest hours, keeping the room within the margin of the target.
+CONF_PRICE_SENSOR = "price_sensor"
+CONF_TARIFF_COMFORT_MARGIN = "tariff_comfort_margin"
+
 # Configuration keys for controlling behavior.
 # (Now using separate thresholds for primary and secondary devices)
 CONF_TEMP_THRESHOLD_PRIMARY = "temp_threshold_primary"
@@ -18,9 +50,28 @@ CONF_OUTDOOR_HOT_THRESHOLD = "outdoor_hot_threshold"  # e.g. 25°C or higher.
 CONF_PRIMARY_OFFSET = "primary_offset"
 CONF_SECONDARY_OFFSET = "secondary_offset"
 
+# Reactive control: sensor changes are coalesced within this window.
+CONF_DEBOUNCE_SECONDS = "debounce_seconds"
+
+# Cycle protection, enforced separately for every device.
+CONF_MIN_RUNTIME_SECONDS = "min_runtime_seconds"
+CONF_MIN_OFF_SECONDS = "min_off_seconds"
+CONF_MAX_SWITCHES_PER_HOUR = "max_switches_per_hour"
+
+# State publication: changes of the current temperature smaller than the
+# deadband are not written, but the state is written at least once per heartbeat.
+CONF_PUBLISH_DEADBAND = "publish_deadband"
+CONF_PUBLISH_HEARTBEAT_SECONDS = "publish_heartbeat_seconds"
+
+# Combine HVAC mode and temperature into one climate.set_temperature call.
+CONF_MERGE_COMMANDS = "merge_commands"
+
 CONF_HEATING_PRESETS = "heating_presets"
 CONF_COOLING_PRESETS = "cooling_presets"
 
+# Weekly schedule of presets, see schedule.py.
+CONF_SCHEDULE = "schedule"
+
 # Default values.
 DEFAULT_TEMP_THRESHOLD_PRIMARY = 0.0
 DEFAULT_TEMP_THRESHOLD_SECONDARY = 2.0
@@ -50,3 +101,63 @@ DEFAULT_OUTDOOR_HOT_THRESHOLD = DEFAULT_COOLING_PRESETS["home"]
 # Default offsets.
 DEFAULT_PRIMARY_OFFSET = 1.0
 DEFAULT_SECONDARY_OFFSET = 0.0
+
+# Reactive control defaults.
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+# The interval timer only acts as a safety net when sensor events are missed.
+SAFETY_INTERVAL_SECONDS = 300
+# Periodic updates are spread over this many slots within the interval.
+STAGGER_SLOTS = 30
+
+# Forecast defaults. A forecast is fetched once per TTL for all entities;
+# a failed fetch is retried sooner.
+DEFAULT_FORECAST_HORIZON_HOURS = 6
+DEFAULT_FORECAST_AGGREGATE = "mean"
+FORECAST_TTL_SECONDS = 3600
+FORECAST_RETRY_SECONDS = 300
+
+DEFAULT_TARIFF_COMFORT_MARGIN = 1.0
+
+# Cycle protection defaults; 0 disables a check.
+DEFAULT_MIN_RUNTIME_SECONDS = 300
+DEFAULT_MIN_OFF_SECONDS = 300
+DEFAULT_MAX_SWITCHES_PER_HOUR = 6
+
+DEFAULT_PUBLISH_DEADBAND = 0.1
+DEFAULT_PUBLISH_HEARTBEAT_SECONDS = 3600
+
+# Only enable for devices that honour hvac_mode in climate.set_temperature.
+DEFAULT_MERGE_COMMANDS = False
+
+# Predictive control: decisions use the temperature the thermal model
+# expects after this many seconds; 0 only learns the model.
+CONF_PREDICTIVE_LEAD_SECONDS = "predictive_lead_seconds"
+DEFAULT_PREDICTIVE_LEAD_SECONDS = 0
+# Predictions are only used after this many samples, and never move the
+# temperature used for decisions by more than the maximum correction.
+MODEL_MIN_SAMPLES = 30
+MODEL_MAX_CORRECTION = 1.0
+
+# Days of recorder history replayed into the thermal model on startup; 0 disables it.
+CONF_WARM_START_DAYS = "warm_start_days"
+DEFAULT_WARM_START_DAYS = 3
+
+# Sensor fusion defaults. A sensor that could not be read for longer than
+# the maximum age is left out; 0 keeps the last reading forever.
+DEFAULT_SENSOR_FUSION = "mean"
+DEFAULT_SENSOR_WINDOW = 1
+DEFAULT_SENSOR_EMA_ALPHA = 0.3
+DEFAULT_SENSOR_MAX_AGE_SECONDS = 0
+
+# Device commands are sent in the background with a timeout and retried
+# with exponential backoff (2, 4, 8 seconds).
+COMMAND_TIMEOUT_SECONDS = 10
+COMMAND_RETRIES = 3
+COMMAND_BACKOFF_SECONDS = 2
+
+# Devices are compared against their live state, except right after a
+# confirmed command, when their reported state may still lag behind.
+RECONCILE_GRACE_SECONDS = 60
+# Setpoints within this distance of the last sent one count as unchanged,
+# since many devices round them to their own step size.
+RECONCILE_TEMPERATURE_TOLERANCE = 0.5
@@ -0,0 +1,187 @@
+"""Shared update scheduling for all Smart Climate entities."""
+import asyncio
+import logging
+import random
+from datetime import timedelta
+
+from homeassistant.core import State, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from .const import SAFETY_INTERVAL_SECONDS, STAGGER_SLOTS
+
+_LOGGER = logging.getLogger(__name__)
+
+UNAVAILABLE_STATES = ("unknown", "unavailable")
+
+# From Home Assistant 2024.4 states record every report, also unchanged ones.
+LAST_REPORTED_SUPPORTED = hasattr(State, "last_reported")
+
+
+def reported_at(state):
+    """Return when the sensor last reported ``state``, as a Unix timestamp.
+
+    ``last_reported`` only exists from Home Assistant 2024.4; on older cores
+    an unchanged reading is as old as its last change.
+    """
+    return getattr(state, "last_reported", state.last_updated).timestamp()
+
+
+def read_temperature(hass, entity_id):
+    """Return (value, reported_at) of a sensor, or None if it cannot be read."""
+    return parse_temperature(entity_id, hass.states.get(entity_id))
+
+
+def parse_temperature(entity_id, state):
+    """Return (value, reported_at) of a sensor state, or None if it is not a temperature."""
+    if state is None or state.state in UNAVAILABLE_STATES:
+        _LOGGER.error("Sensor %s not found or state is unknown/unavailable", entity_id)
+        return None
+    try:
+        return float(state.state), reported_at(state)
+    except (TypeError, ValueError) as e:
+        _LOGGER.error("Error reading sensor %s: %s", entity_id, e)
+        return None
+
+
+class SmartClimateCoordinator:
+    """Run the periodic update for every entity from a single timer.
+
+    The interval is divided into at most ``slots`` slots; every entity is
+    assigned to a slot of its own until they run out, then to the least busy
+    one. The timer fires once per occupied slot, so entity updates are spread
+    evenly across the interval instead of all running at once, without
+    waking up for empty slots. It starts at a random point of its first
+    period, so the ticks do not line up with other timers.
+
+    Each slot reads every distinct sensor of its entities once and hands the
+    resulting snapshot to them. Parsed readings are kept for the rest of the
+    cycle and reused as long as the state did not change, so a sensor shared
+    between zones in different slots (such as a common outdoor sensor) is
+    only parsed once per cycle.
+
+    With ``interval`` set to None no timer is started and cycles are only run
+    through ``async_refresh``.
+    """
+
+    def __init__(self, hass, interval=timedelta(seconds=SAFETY_INTERVAL_SECONDS), slots=STAGGER_SLOTS):
+        self.hass = hass
+        self._interval = interval
+        self._max_slots = slots
+        # Only occupied slots are kept; every slot is a list of entities.
+        self._slots = []
+        self._slot_sensors = []
+        self._next_slot = 0
+        self._period = None
+        self._unsub = None
+        # sensor -> (state, parsed value) for the cycle that is running.
+        self._parsed = {}
+
+    @property
+    def entities(self):
+        """Return all registered entities."""
+        return [entity for slot in self._slots for entity in slot]
+
+    @callback
+    def async_add_entity(self, entity):
+        """Register an entity and return a callback that removes it again."""
+        if len(self._slots) < self._max_slots:
+            slot = []
+            self._slots.append(slot)
+            self._slot_sensors.append(frozenset())
+        else:
+            slot = min(self._slots, key=len)
+        slot.append(entity)
+        self._update_sensors(slot)
+        self._async_arm()
+
+        @callback
+        def remove_entity():
+            slot.remove(entity)
+            if slot:
+                self._update_sensors(slot)
+            else:
+                index = self._index(slot)
+                del self._slots[index]
+                del self._slot_sensors[index]
+                if self._next_slot > index:
+                    self._next_slot -= 1
+                if self._next_slot >= len(self._slots):
+                    self._next_slot = 0
+            self._async_arm()
+
+        return remove_entity
+
+    def _index(self, slot):
+        return next(index for index, other in enumerate(self._slots) if other is slot)
+
+    def _update_sensors(self, slot):
+        self._slot_sensors[self._index(slot)] = frozenset(
+            sensor for entity in slot for sensor in entity.tracked_sensors
+        )
+
+    @callback
+    def _async_arm(self):
+        """(Re)start the timer when the number of occupied slots changed."""
+        if self._interval is None:
+            return
+        period = self._interval / len(self._slots) if self._slots else None
+        if period == self._period:
+            return
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._period = period
+        if period is not None:
+            self._unsub = async_call_later(
+                self.hass, random.uniform(0, period.total_seconds()), self._async_start_interval
+            )
+
+    async def _async_start_interval(self, now_time=None):
+        self._unsub = async_track_time_interval(self.hass, self._async_tick, self._period)
+        await self._async_tick(now_time)
+
+    @callback
+    def async_snapshot(self, sensors):
+        """Read each of the given sensors once, reusing readings parsed earlier in the cycle."""
+        snapshot = {}
+        parsed = self._parsed
+        get_state = self.hass.states.get
+        for sensor in sensors:
+            state = get_state(sensor)
+            cached = parsed.get(sensor)
+            if cached is not None and cached[0] is state:
+                # The same state object: only the report time may have moved on.
+                snapshot[sensor] = cached[1] if cached[1] is None else (cached[1][0], reported_at(state))
+                continue
+            reading = parse_temperature(sensor, state)
+            parsed[sensor] = (state, reading)
+            snapshot[sensor] = reading
+        return snapshot
+
+    async def _async_tick(self, now_time=None):
+        """Update the entities of the next slot."""
+        if not self._slots:
+            return
+        index = self._next_slot
+        self._next_slot = (index + 1) % len(self._slots)
+        if index == 0:
+            # A new cycle; drop the readings of sensors that are no longer used.
+            self._parsed = {}
+        await self._async_update(self._slots[index], self._slot_sensors[index])
+
+    async def async_refresh(self, now_time=None):
+        """Run one update cycle for all registered entities at once."""
+        entities = self.entities
+        self._parsed = {}
+        if entities:
+            await self._async_update(entities, frozenset().union(*self._slot_sensors))
+
+    async def _async_update(self, entities, sensors):
+        snapshot = self.async_snapshot(sensors)
+        results = await asyncio.gather(
+            *(entity.async_handle_snapshot(snapshot) for entity in list(entities)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                _LOGGER.error("Error updating smart climate entity: %s", result)
@@ -0,0 +1,60 @@
+"""Protection against short-cycling of climate devices."""
+from collections import deque
+
+SECONDS_PER_HOUR = 3600
+
+
+class CycleGuard:
+    """Enforce minimum on/off times and a switch rate limit for one device.
+
+    Times are plain monotonic seconds supplied by the caller. A limit of 0
+    disables the corresponding check.
+    """
+
+    __slots__ = ("min_on", "min_off", "max_switches_per_hour", "suppressed", "_last_switch", "_switches")
+
+    def __init__(self, min_on=0, min_off=0, max_switches_per_hour=0):
+        self.min_on = min_on
+        self.min_off = min_off
+        self.max_switches_per_hour = max_switches_per_hour
+        # Number of switches that were held back.
+        self.suppressed = 0
+        self._last_switch = None
+        self._switches = deque(maxlen=max_switches_per_hour or None)
+
+    def configure(self, min_on, min_off, max_switches_per_hour):
+        """Change the limits, keeping the switch history."""
+        self.min_on = min_on
+        self.min_off = min_off
+        if max_switches_per_hour != self.max_switches_per_hour:
+            self._switches = deque(self._switches, maxlen=max_switches_per_hour or None)
+        self.max_switches_per_hour = max_switches_per_hour
+
+    @property
+    def last_switch(self):
+        """Return when the device was last switched, or None."""
+        return self._last_switch
+
+    def allow(self, was_on, want_on, now):
+        """Return whether the device may go from ``was_on`` to ``want_on`` now."""
+        if was_on == want_on:
+            return True
+        if self._last_switch is not None:
+            elapsed = now - self._last_switch
+            if elapsed < (self.min_on if was_on else self.min_off):
+                self.suppressed += 1
+                return False
+        if (
+            self.max_switches_per_hour
+            and len(self._switches) == self.max_switches_per_hour
+            and now - self._switches[0] < SECONDS_PER_HOUR
+        ):
+            self.suppressed += 1
+            return False
+        return True
+
+    def record_switch(self, now):
+        """Remember that the device was switched on or off at ``now``."""
+        self._last_switch = now
+        if self.max_switches_per_hour:
+            self._switches.append(now)
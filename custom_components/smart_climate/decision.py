@@ -0,0 +1,226 @@
+"""Side-effect-free decision engine for the Smart Climate controller.
+
+The functions in this module only work on plain numbers and never touch
+Home Assistant, so they can be used by the entity as well as offline to
+replay recorded data.
+"""
+from bisect import bisect_left
+from collections import namedtuple
+
+# HVAC modes as plain strings; HVACMode is a StrEnum, so these compare equal.
+MODE_OFF = "off"
+MODE_HEAT = "heat"
+MODE_COOL = "cool"
+
+# Integer codes used by the batched engine.
+MODE_CODES = (MODE_OFF, MODE_HEAT, MODE_COOL)
+CODE_OFF = 0
+CODE_HEAT = 1
+CODE_COOL = 2
+
+# A boost stage joins the main device once the temperature is more than
+# ``threshold`` away from the target, in any of its ``modes``.
+Stage = namedtuple("Stage", ["threshold", "offset", "modes"])
+
+# ``stages`` are in configuration order; ``stage_thresholds`` holds their
+# thresholds sorted and ``stage_ranks`` the position of each stage in it.
+DecisionParams = namedtuple(
+    "DecisionParams",
+    [
+        "primary_threshold",
+        "outdoor_hot_threshold",
+        "primary_offset",
+        "stages",
+        "stage_thresholds",
+        "stage_ranks",
+    ],
+)
+
+# Command last sent to (or desired for) one boost stage.
+StageCommand = namedtuple("StageCommand", ["mode", "temp"])
+
+STAGE_OFF = StageCommand(MODE_OFF, None)
+
+# Commands for the main device and, per stage, the boost devices.
+Commands = namedtuple("Commands", ["main_mode", "main_temp", "stages"])
+
+Decision = namedtuple(
+    "Decision",
+    [
+        "effective_mode",
+        "diff",
+        "cooling_suppressed",
+        "commands",
+        "send_main_mode",
+        "send_main_temp",
+        "send_stages",
+    ],
+)
+
+
+def make_params(primary_threshold, outdoor_hot_threshold, primary_offset, stages=()):
+    """Return DecisionParams with the stage lookup tables filled in."""
+    stages = tuple(stages)
+    order = sorted(range(len(stages)), key=lambda index: stages[index].threshold)
+    ranks = [0] * len(stages)
+    for rank, index in enumerate(order):
+        ranks[index] = rank
+    return DecisionParams(
+        primary_threshold,
+        outdoor_hot_threshold,
+        primary_offset,
+        stages,
+        tuple(stages[index].threshold for index in order),
+        tuple(ranks),
+    )
+
+
+def initial_commands(stage_count=0):
+    """Return the commands of a controller whose devices are all off."""
+    return Commands(MODE_OFF, None, (STAGE_OFF,) * stage_count)
+
+
+def decide(current_temp, outdoor_temp, target_temp, params, previous=None):
+    """Return the decision for a single set of readings.
+
+    ``outdoor_temp`` and ``target_temp`` may be None when unknown. The
+    returned commands replace ``previous`` once they have been sent.
+    """
+    if previous is None:
+        previous = initial_commands(len(params.stages))
+
+    if target_temp is None:
+        # Without a target everything is switched off.
+        return Decision(
+            MODE_OFF,
+            0,
+            False,
+            Commands(MODE_OFF, previous.main_temp, (STAGE_OFF,) * len(params.stages)),
+            previous.main_mode != MODE_OFF,
+            False,
+            tuple(stage.mode != MODE_OFF for stage in previous.stages),
+        )
+
+    cooling_suppressed = False
+    if current_temp < target_temp - params.primary_threshold:
+        effective_mode = MODE_HEAT
+        diff = target_temp - current_temp
+    elif current_temp > target_temp + params.primary_threshold:
+        diff = current_temp - target_temp
+        if outdoor_temp is not None and outdoor_temp >= params.outdoor_hot_threshold:
+            effective_mode = MODE_COOL
+        else:
+            effective_mode = MODE_OFF
+            cooling_suppressed = True
+    else:
+        effective_mode = MODE_OFF
+        diff = 0
+
+    main_temp = previous.main_temp
+    send_main_temp = False
+    if effective_mode != MODE_OFF:
+        main_temp = target_temp + params.primary_offset
+        send_main_temp = main_temp != previous.main_temp
+
+    # Stages whose threshold is below the difference are active.
+    active = bisect_left(params.stage_thresholds, diff) if effective_mode != MODE_OFF else 0
+    stage_commands = tuple([
+        StageCommand(effective_mode, target_temp + stage.offset)
+        if rank < active and effective_mode in stage.modes
+        else STAGE_OFF
+        for stage, rank in zip(params.stages, params.stage_ranks)
+    ])
+
+    return Decision(
+        effective_mode,
+        diff,
+        cooling_suppressed,
+        Commands(effective_mode, main_temp, stage_commands),
+        effective_mode != previous.main_mode,
+        send_main_temp,
+        tuple([command != last for command, last in zip(stage_commands, previous.stages)]),
+    )
+
+
+def decide_batch(current_temp, outdoor_temp, target_temp, params):
+    """Evaluate many rows at once with NumPy.
+
+    All inputs are array-likes that broadcast against each other; unknown
+    values are NaN. Fields of ``params`` may be arrays as well, e.g. with
+    shape ``(k, 1)`` to sweep ``k`` configurations over ``n`` rows. Rows are
+    treated as consecutive ticks along the last axis, so the ``send_*``
+    arrays mirror what the entity would send starting from all devices off.
+
+    Returns a dict of arrays; the ``stage_*`` and ``send_stage`` entries are
+    lists with one array per stage. Modes are encoded with the ``CODE_*``
+    values and temperatures are NaN where no temperature applies.
+    """
+    import numpy as np  # Only needed for offline evaluation.
+
+    current = np.asarray(current_temp, dtype=float)
+    outdoor = np.asarray(outdoor_temp, dtype=float)
+    target = np.asarray(target_temp, dtype=float)
+    primary_threshold = np.asarray(params.primary_threshold, dtype=float)
+
+    has_target = ~np.isnan(target)
+    heat = has_target & (current < target - primary_threshold)
+    above = has_target & (current > target + primary_threshold)
+    cool = above & (outdoor >= params.outdoor_hot_threshold)
+
+    effective_mode = np.where(heat, CODE_HEAT, np.where(cool, CODE_COOL, CODE_OFF)).astype(np.int8)
+    diff = np.where(heat, target - current, np.where(above, current - target, 0.0))
+    main_temp = np.where(effective_mode != CODE_OFF, target + params.primary_offset, np.nan)
+
+    stage_modes = []
+    stage_temps = []
+    for stage in params.stages:
+        allowed = np.isin(effective_mode, [MODE_CODES.index(mode) for mode in stage.modes])
+        boost = has_target & allowed & (diff > np.asarray(stage.threshold, dtype=float))
+        stage_mode = np.where(boost, effective_mode, CODE_OFF).astype(np.int8)
+        stage_modes.append(stage_mode)
+        stage_temps.append(np.where(stage_mode != CODE_OFF, target + stage.offset, np.nan))
+
+    return {
+        "effective_mode": effective_mode,
+        "diff": diff,
+        "cooling_suppressed": above & ~cool,
+        "main_temp": main_temp,
+        "stage_mode": stage_modes,
+        "stage_temp": stage_temps,
+        "send_main_mode": _changed(effective_mode, CODE_OFF),
+        "send_main_temp": (effective_mode != CODE_OFF) & (main_temp != _last_sent(main_temp)),
+        "send_stage": [
+            _changed(mode, CODE_OFF) | (_changed(temp, np.nan) & (mode != CODE_OFF))
+            for mode, temp in zip(stage_modes, stage_temps)
+        ],
+    }
+
+
+def _changed(values, initial):
+    """Return a mask of positions whose value differs from the previous one."""
+    import numpy as np
+
+    previous = np.concatenate(
+        [np.full(values.shape[:-1] + (1,), initial, dtype=values.dtype), values[..., :-1]],
+        axis=-1,
+    )
+    if values.dtype.kind == "f":
+        both_nan = np.isnan(values) & np.isnan(previous)
+        return (values != previous) & ~both_nan
+    return values != previous
+
+
+def _last_sent(values):
+    """Return, per position, the last non-NaN value before it (NaN if none)."""
+    import numpy as np
+
+    values = np.asarray(values)
+    positions = np.arange(values.shape[-1])
+    index = np.where(np.isnan(values), -1, positions)
+    index = np.maximum.accumulate(index, axis=-1)
+    # Shift by one so every position only sees earlier rows.
+    index = np.concatenate(
+        [np.full(index.shape[:-1] + (1,), -1), index[..., :-1]], axis=-1
+    )
+    previous = np.take_along_axis(values, np.maximum(index, 0), axis=-1)
+    return np.where(index < 0, np.nan, previous)
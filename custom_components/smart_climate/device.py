@@ -0,0 +1,28 @@
+"""A climate device controlled by a Smart Climate entity."""
+from homeassistant.components.climate.const import HVACMode
+
+from .command_queue import DeviceCommandQueue
+from .cycle_guard import CycleGuard
+
+
+class ClimateDevice:
+    """One controlled device: its command queue, cycle guard and confirmed state.
+
+    ``mode`` and ``temperature`` hold what the device last confirmed, and
+    ``confirmed_at`` when (on the entity's clock) that happened.
+    """
+
+    __slots__ = ("entity_id", "queue", "guard", "mode", "temperature", "confirmed_at")
+
+    def __init__(self, hass, entity_id, plan, metrics=None):
+        self.entity_id = entity_id
+        self.queue = DeviceCommandQueue(hass, entity_id, plan.merge_commands, metrics=metrics)
+        self.guard = CycleGuard(plan.min_runtime, plan.min_off, plan.max_switches_per_hour)
+        self.mode = HVACMode.OFF
+        self.temperature = None
+        self.confirmed_at = None
+
+    def configure(self, plan):
+        """Apply the settings of a new plan, keeping the device state."""
+        self.queue.merge = plan.merge_commands
+        self.guard.configure(plan.min_runtime, plan.min_off, plan.max_switches_per_hour)
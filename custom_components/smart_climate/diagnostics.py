@@ -0,0 +1,19 @@
+"""Diagnostics support for Smart Climate."""
+from .const import DATA_ENTITY, DATA_FORECAST, DATA_METRICS, DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return diagnostics for a config entry."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    metrics = entry_data.get(DATA_METRICS)
+    entity = entry_data.get(DATA_ENTITY)
+    forecast = hass.data.get(DOMAIN, {}).get(DATA_FORECAST)
+    return {
+        "config": dict(entry.data),
+        "options": dict(entry.options),
+        "metrics": metrics.as_dict() if metrics is not None else None,
+        "thermal_model": entity.thermal_model.as_dict() if entity is not None else None,
+        "forecast": forecast.as_dict() if forecast is not None else None,
+        "tariff_plan": entity.tariff_plan.as_dict() if entity is not None and entity.tariff_plan is not None else None,
+        "decisions": entity.decision_trace.entries(entity.devices) if entity is not None else None,
+    }
@@ -0,0 +1,59 @@
+"""Translate device commands into climate service calls.
+
+The calls for a single device are sent in order: each call is blocking, so
+the next one only starts once the device's integration handled the
+previous one. Different devices are handled by their own command queue and
+are updated concurrently.
+"""
+import logging
+import time
+from collections import namedtuple
+
+_LOGGER = logging.getLogger(__name__)
+
+CLIMATE_DOMAIN = "climate"
+
+# A change for one device; fields set to None are left unchanged.
+DeviceCommand = namedtuple("DeviceCommand", ["entity_id", "hvac_mode", "temperature"])
+
+
+def build_calls(command, merge=False):
+    """Return the ordered (service, service_data) calls for one device command.
+
+    With ``merge`` the mode and temperature are combined into a single
+    ``climate.set_temperature`` call, which only works for devices that honour
+    ``hvac_mode`` in that service. Switching a device off always uses
+    ``set_hvac_mode``.
+    """
+    calls = []
+    has_temperature = command.temperature is not None and command.hvac_mode != "off"
+    if merge and has_temperature:
+        service_data = {"entity_id": command.entity_id, "temperature": command.temperature}
+        if command.hvac_mode is not None:
+            service_data["hvac_mode"] = command.hvac_mode
+        return [("set_temperature", service_data)]
+
+    if command.hvac_mode is not None:
+        calls.append(("set_hvac_mode", {"entity_id": command.entity_id, "hvac_mode": command.hvac_mode}))
+    if has_temperature:
+        calls.append(("set_temperature", {"entity_id": command.entity_id, "temperature": command.temperature}))
+    return calls
+
+
+async def async_send_command(hass, command, merge=False, histogram=None):
+    """Send the calls for a single device one after another.
+
+    Every call is blocking, so it only returns once the device's integration
+    handled it, and raises when the integration rejected it.
+    The round-trip time of every call is recorded in ``histogram`` if given,
+    also for calls that fail or are cancelled by a timeout, so slow devices
+    show up in it.
+    """
+    for service, service_data in build_calls(command, merge):
+        _LOGGER.debug("Calling climate.%s with %s", service, service_data)
+        started = time.perf_counter()
+        try:
+            await hass.services.async_call(CLIMATE_DOMAIN, service, service_data, blocking=True)
+        finally:
+            if histogram is not None:
+                histogram.observe(time.perf_counter() - started)
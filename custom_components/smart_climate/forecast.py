@@ -0,0 +1,102 @@
+"""Weather forecast lookahead, shared by all Smart Climate entities."""
+import logging
+import time
+from bisect import bisect_right
+
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import FORECAST_RETRY_SECONDS, FORECAST_TTL_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
+
+SECONDS_PER_HOUR = 3600
+
+FORECAST_MEAN = "mean"
+FORECAST_PEAK = "peak"
+FORECAST_AGGREGATES = [FORECAST_MEAN, FORECAST_PEAK]
+
+
+class ForecastCache:
+    """Hourly forecasts of weather entities, fetched at most once per TTL.
+
+    Entities read a forecast without waiting for it: an expired (or missing)
+    forecast is refreshed in the background, once, however many entities
+    use it, and the old one is used until then.
+    """
+
+    def __init__(self, hass, ttl=FORECAST_TTL_SECONDS, clock=time.monotonic):
+        self.hass = hass
+        self.ttl = ttl
+        self._clock = clock
+        self.fetches = 0
+        # entity_id -> (start times, temperatures), sorted by time.
+        self._forecasts = {}
+        self._expires = {}
+        self._pending = {}
+
+    @callback
+    def outlook(self, entity_id, hours, aggregate, now=None):
+        """Return the mean or peak forecast temperature for the next ``hours``.
+
+        The hour that is running counts as well. Returns None while there is
+        no forecast, or when it does not cover the coming hours.
+        """
+        self._async_refresh_if_expired(entity_id)
+        forecast = self._forecasts.get(entity_id)
+        if forecast is None:
+            return None
+        times, temperatures = forecast
+        now = time.time() if now is None else now
+        values = temperatures[
+            bisect_right(times, now - SECONDS_PER_HOUR):bisect_right(times, now + hours * SECONDS_PER_HOUR)
+        ]
+        if not values:
+            return None
+        if aggregate == FORECAST_PEAK:
+            return max(values)
+        return sum(values) / len(values)
+
+    def as_dict(self):
+        return {
+            "fetches": self.fetches,
+            "forecasts": {entity_id: len(times) for entity_id, (times, _) in self._forecasts.items()},
+        }
+
+    @callback
+    def _async_refresh_if_expired(self, entity_id):
+        if entity_id in self._pending or self._clock() < self._expires.get(entity_id, float("-inf")):
+            return
+        self._pending[entity_id] = self.hass.async_create_task(self._async_fetch(entity_id))
+
+    async def _async_fetch(self, entity_id):
+        self.fetches += 1
+        try:
+            response = await self.hass.services.async_call(
+                "weather",
+                "get_forecasts",
+                {"entity_id": entity_id, "type": "hourly"},
+                blocking=True,
+                return_response=True,
+            )
+            self._forecasts[entity_id] = _parse_forecast(response[entity_id]["forecast"])
+            self._expires[entity_id] = self._clock() + self.ttl
+            _LOGGER.debug("Fetched %s forecast hours of %s", len(self._forecasts[entity_id][0]), entity_id)
+        except (HomeAssistantError, KeyError, TypeError, ValueError) as err:
+            _LOGGER.warning("Could not fetch the hourly forecast of %s: %s", entity_id, err)
+            self._expires[entity_id] = self._clock() + FORECAST_RETRY_SECONDS
+        finally:
+            self._pending.pop(entity_id, None)
+
+
+def _parse_forecast(forecast):
+    """Return (start times, temperatures) of the hours that have a temperature."""
+    hours = []
+    for item in forecast:
+        start = dt_util.parse_datetime(str(item.get("datetime")))
+        temperature = item.get("temperature")
+        if start is not None and temperature is not None:
+            hours.append((start.timestamp(), float(temperature)))
+    hours.sort()
+    return tuple(start for start, _ in hours), tuple(temperature for _, temperature in hours)
@@ -0,0 +1,111 @@
+"""Fusion of several temperature sensors into a single reading.
+
+Every sensor keeps its last readings in a fixed-size ring buffer with a
+running sum, so adding a reading and taking its rolling mean or moving
+average are constant-time, however long the controller runs.
+"""
+from array import array
+from statistics import median
+
+FUSION_MEAN = "mean"
+FUSION_MEDIAN = "median"
+FUSION_MIN = "min"
+FUSION_MAX = "max"
+FUSION_EMA = "ema"
+FUSION_STRATEGIES = [FUSION_MEAN, FUSION_MEDIAN, FUSION_MIN, FUSION_MAX, FUSION_EMA]
+
+_COMBINE = {
+    FUSION_MEAN: lambda values: sum(values) / len(values),
+    FUSION_MEDIAN: median,
+    FUSION_MIN: min,
+    FUSION_MAX: max,
+    # Every sensor is smoothed on its own, then the averages are combined.
+    FUSION_EMA: lambda values: sum(values) / len(values),
+}
+
+
+class SensorBuffer:
+    """Ring buffer of the last readings of one sensor."""
+
+    __slots__ = ("values", "size", "index", "count", "total", "ema", "seen_at")
+
+    def __init__(self, size):
+        self.size = max(int(size), 1)
+        self.values = array("d", [0.0]) * self.size
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.ema = None
+        # When the sensor last reported a reading.
+        self.seen_at = None
+
+    @property
+    def latest(self):
+        return self.values[self.index - 1] if self.count else None
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def push(self, value, alpha):
+        """Add a reading, replacing the oldest one once the buffer is full."""
+        if self.count == self.size:
+            self.total -= self.values[self.index]
+        else:
+            self.count += 1
+        self.values[self.index] = value
+        self.total += value
+        self.index += 1
+        if self.index == self.size:
+            self.index = 0
+            # Drop the rounding error the running sum builds up, once per lap.
+            self.total = sum(self.values[:self.count])
+        self.ema = value if self.ema is None else self.ema + alpha * (value - self.ema)
+
+
+class SensorFusion:
+    """Combine the readings of several sensors into one value.
+
+    Readings are added with :meth:`add`, with the time the sensor reported
+    them; a reading equal to the last one only marks the sensor as seen, so
+    polling a sensor that did not change does not skew its average. Sensors
+    not seen for more than ``max_age`` seconds are left out of the fused
+    value.
+    """
+
+    __slots__ = ("entity_ids", "strategy", "alpha", "max_age", "_buffers", "_combine")
+
+    def __init__(self, entity_ids, strategy=FUSION_MEAN, window=1, alpha=0.3, max_age=0):
+        self.entity_ids = tuple(entity_ids)
+        self._buffers = {entity_id: SensorBuffer(window) for entity_id in self.entity_ids}
+        self.configure(strategy, window, alpha, max_age)
+
+    def configure(self, strategy, window, alpha, max_age):
+        """Change the settings; readings are kept unless the window changed."""
+        self.strategy = strategy
+        self._combine = _COMBINE[strategy]
+        self.alpha = alpha
+        self.max_age = max_age
+        if any(buffer.size != max(int(window), 1) for buffer in self._buffers.values()):
+            self._buffers = {entity_id: SensorBuffer(window) for entity_id in self.entity_ids}
+
+    def add(self, entity_id, value, reported):
+        """Record a reading of one sensor, reported at ``reported``."""
+        buffer = self._buffers[entity_id]
+        if buffer.count == 0 or value != buffer.latest:
+            buffer.push(value, self.alpha)
+        buffer.seen_at = reported
+
+    def value(self, now):
+        """Return the fused reading of the fresh sensors, or None if there are none."""
+        use_ema = self.strategy == FUSION_EMA
+        values = [
+            buffer.ema if use_ema else buffer.mean
+            for buffer in self._buffers.values()
+            if buffer.count and (not self.max_age or now - buffer.seen_at <= self.max_age)
+        ]
+        if not values:
+            return None
+        if len(values) == 1:
+            return values[0]
+        return self._combine(values)
@@ -0,0 +1,96 @@
+"""Lightweight performance counters for Smart Climate entities.
+
+Everything here has a fixed size, so recording a value is a few integer
+operations and memory use does not grow with uptime.
+"""
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the latency buckets; one extra bucket catches the rest.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "maximum")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, fraction):
+        """Return the upper bound of the bucket holding the given quantile."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.maximum
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.maximum,
+            "buckets": dict(zip([*map(str, self.bounds), "inf"], self.counts)),
+        }
+
+
+class EntityMetrics:
+    """Counters and latency histograms for one entity."""
+
+    __slots__ = (
+        "updates",
+        "updates_coalesced",
+        "commands_sent",
+        "commands_suppressed",
+        "commands_failed",
+        "switches_suppressed",
+        "sensor_failures",
+        "state_writes_skipped",
+        "apply_duration",
+        "service_call_duration",
+    )
+
+    # commands_failed counts failed attempts, including ones that were retried.
+    COUNTERS = (
+        "updates",
+        "updates_coalesced",
+        "commands_sent",
+        "commands_suppressed",
+        "commands_failed",
+        "switches_suppressed",
+        "sensor_failures",
+        "state_writes_skipped",
+    )
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.apply_duration = Histogram()
+        self.service_call_duration = Histogram()
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.COUNTERS}
+        data["apply_duration"] = self.apply_duration.as_dict()
+        data["service_call_duration"] = self.service_call_duration.as_dict()
+        return data
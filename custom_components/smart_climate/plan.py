@@ -0,0 +1,381 @@
+"""Compiled, immutable controller configuration.
+
+A ``ControlPlan`` is built once from a (YAML or config entry) configuration.
+Presets are validated and the preset table is precomputed, so nothing has
+to be parsed or recomputed while the controller runs. Plans are cached:
+every entity with the same settings shares a single instance.
+"""
+import json
+from functools import lru_cache
+from types import MappingProxyType
+
+import voluptuous as vol
+
+from .const import (
+    CONF_COOLING_PRESETS,
+    CONF_DEBOUNCE_SECONDS,
+    CONF_FORECAST_AGGREGATE,
+    CONF_FORECAST_HORIZON_HOURS,
+    CONF_HEATING_PRESETS,
+    CONF_MAX_SWITCHES_PER_HOUR,
+    CONF_MERGE_COMMANDS,
+    CONF_MIN_OFF_SECONDS,
+    CONF_MIN_RUNTIME_SECONDS,
+    CONF_OUTDOOR_HOT_THRESHOLD,
+    CONF_PREDICTIVE_LEAD_SECONDS,
+    CONF_PRICE_SENSOR,
+    CONF_PRIMARY_OFFSET,
+    CONF_PUBLISH_DEADBAND,
+    CONF_PUBLISH_HEARTBEAT_SECONDS,
+    CONF_SCHEDULE,
+    CONF_SECONDARY_CLIMATE,
+    CONF_MAIN_CLIMATE,
+    CONF_OUTDOOR_SENSOR,
+    CONF_SECONDARY_OFFSET,
+    CONF_SENSOR,
+    CONF_SENSOR_EMA_ALPHA,
+    CONF_SENSOR_FUSION,
+    CONF_SENSOR_MAX_AGE_SECONDS,
+    CONF_SENSOR_WINDOW,
+    CONF_STAGE_CLIMATE,
+    CONF_STAGE_MODES,
+    CONF_STAGE_OFFSET,
+    CONF_STAGE_THRESHOLD,
+    CONF_STAGES,
+    CONF_TARIFF_COMFORT_MARGIN,
+    CONF_TEMP_THRESHOLD_PRIMARY,
+    CONF_TEMP_THRESHOLD_SECONDARY,
+    CONF_WEATHER,
+    CONF_WARM_START_DAYS,
+    DEFAULT_COOLING_PRESETS,
+    DEFAULT_DEBOUNCE_SECONDS,
+    DEFAULT_FORECAST_AGGREGATE,
+    DEFAULT_FORECAST_HORIZON_HOURS,
+    DEFAULT_HEATING_PRESETS,
+    DEFAULT_MAX_SWITCHES_PER_HOUR,
+    DEFAULT_MERGE_COMMANDS,
+    DEFAULT_MIN_OFF_SECONDS,
+    DEFAULT_MIN_RUNTIME_SECONDS,
+    DEFAULT_OUTDOOR_HOT_THRESHOLD,
+    DEFAULT_PREDICTIVE_LEAD_SECONDS,
+    DEFAULT_PRIMARY_OFFSET,
+    DEFAULT_PUBLISH_DEADBAND,
+    DEFAULT_PUBLISH_HEARTBEAT_SECONDS,
+    DEFAULT_SECONDARY_OFFSET,
+    DEFAULT_SENSOR_EMA_ALPHA,
+    DEFAULT_SENSOR_FUSION,
+    DEFAULT_SENSOR_MAX_AGE_SECONDS,
+    DEFAULT_SENSOR_WINDOW,
+    DEFAULT_TARIFF_COMFORT_MARGIN,
+    DEFAULT_TEMP_THRESHOLD_PRIMARY,
+    DEFAULT_TEMP_THRESHOLD_SECONDARY,
+    DEFAULT_WARM_START_DAYS,
+    STAGE_MODES,
+)
+from .decision import Stage, make_params
+from .forecast import FORECAST_AGGREGATES
+from .fusion import FUSION_STRATEGIES
+from .schedule import Schedule, validate_schedule
+
+# Distinct plans kept in the cache. Entities hold on to the plan they use, so
+# an evicted plan is only compiled again, never lost; plans superseded by an
+# options change are eventually dropped.
+PLAN_CACHE_SIZE = 128
+
+# Settings stored in a plan, with their defaults; the order defines the cache key.
+PLAN_SETTINGS = (
+    (CONF_TEMP_THRESHOLD_PRIMARY, DEFAULT_TEMP_THRESHOLD_PRIMARY),
+    (CONF_OUTDOOR_HOT_THRESHOLD, DEFAULT_OUTDOOR_HOT_THRESHOLD),
+    (CONF_PRIMARY_OFFSET, DEFAULT_PRIMARY_OFFSET),
+    (CONF_DEBOUNCE_SECONDS, DEFAULT_DEBOUNCE_SECONDS),
+    (CONF_MERGE_COMMANDS, DEFAULT_MERGE_COMMANDS),
+    (CONF_MIN_RUNTIME_SECONDS, DEFAULT_MIN_RUNTIME_SECONDS),
+    (CONF_MIN_OFF_SECONDS, DEFAULT_MIN_OFF_SECONDS),
+    (CONF_MAX_SWITCHES_PER_HOUR, DEFAULT_MAX_SWITCHES_PER_HOUR),
+    (CONF_PUBLISH_DEADBAND, DEFAULT_PUBLISH_DEADBAND),
+    (CONF_PUBLISH_HEARTBEAT_SECONDS, DEFAULT_PUBLISH_HEARTBEAT_SECONDS),
+    (CONF_SENSOR_FUSION, DEFAULT_SENSOR_FUSION),
+    (CONF_SENSOR_WINDOW, DEFAULT_SENSOR_WINDOW),
+    (CONF_SENSOR_EMA_ALPHA, DEFAULT_SENSOR_EMA_ALPHA),
+    (CONF_SENSOR_MAX_AGE_SECONDS, DEFAULT_SENSOR_MAX_AGE_SECONDS),
+    (CONF_PREDICTIVE_LEAD_SECONDS, DEFAULT_PREDICTIVE_LEAD_SECONDS),
+    (CONF_WARM_START_DAYS, DEFAULT_WARM_START_DAYS),
+    (CONF_FORECAST_HORIZON_HOURS, DEFAULT_FORECAST_HORIZON_HOURS),
+    (CONF_FORECAST_AGGREGATE, DEFAULT_FORECAST_AGGREGATE),
+    (CONF_TARIFF_COMFORT_MARGIN, DEFAULT_TARIFF_COMFORT_MARGIN),
+)
+
+
+def validate_presets(value):
+    """Validate a preset table given as a mapping or a JSON string.
+
+    Returns a tuple of (name, temperature) pairs; a temperature of None
+    means the preset does not apply to that mode.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError as err:
+            raise vol.Invalid(f"Presets are not valid JSON: {err}") from err
+    if isinstance(value, (tuple, list)):
+        try:
+            value = dict(value)
+        except (TypeError, ValueError) as err:
+            raise vol.Invalid("Presets must be a mapping of name to temperature") from err
+    if not isinstance(value, dict):
+        raise vol.Invalid("Presets must be a mapping of name to temperature")
+
+    presets = []
+    for name, temperature in value.items():
+        if not isinstance(name, str) or not name:
+            raise vol.Invalid(f"Invalid preset name: {name!r}")
+        if temperature is not None:
+            if isinstance(temperature, bool) or not isinstance(temperature, (int, float)):
+                raise vol.Invalid(f"Invalid temperature for preset {name}: {temperature!r}")
+            temperature = float(temperature)
+        presets.append((name, temperature))
+    return tuple(presets)
+
+
+def config_stages(config):
+    """Return the boost stages of a configuration as (entity_id, Stage) pairs.
+
+    Stages keep their configuration order; a ``secondary_climate`` is the
+    first stage and allows both modes. Raises ``vol.Invalid`` for malformed
+    stages or devices that are used twice.
+    """
+    stages = []
+    secondary = config.get(CONF_SECONDARY_CLIMATE)
+    if secondary:
+        threshold = config.get(CONF_TEMP_THRESHOLD_SECONDARY)
+        offset = config.get(CONF_SECONDARY_OFFSET)
+        stages.append((secondary, Stage(
+            float(DEFAULT_TEMP_THRESHOLD_SECONDARY if threshold is None else threshold),
+            float(DEFAULT_SECONDARY_OFFSET if offset is None else offset),
+            tuple(STAGE_MODES),
+        )))
+    for item in config.get(CONF_STAGES) or ():
+        try:
+            entity_id = item[CONF_STAGE_CLIMATE]
+            stage = Stage(
+                float(item[CONF_STAGE_THRESHOLD]),
+                float(item.get(CONF_STAGE_OFFSET) or 0.0),
+                tuple(item.get(CONF_STAGE_MODES) or STAGE_MODES),
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as err:
+            raise vol.Invalid(f"Invalid stage: {item!r}") from err
+        if not entity_id or any(mode not in STAGE_MODES for mode in stage.modes):
+            raise vol.Invalid(f"Invalid stage: {item!r}")
+        stages.append((entity_id, stage))
+
+    devices = [config.get(CONF_MAIN_CLIMATE), *(entity_id for entity_id, _ in stages)]
+    if len(set(devices)) != len(devices):
+        raise vol.Invalid("Every climate device can only be used once")
+    return tuple(stages)
+
+
+def config_sensors(config, key):
+    """Return the sensors configured under ``key`` as a tuple.
+
+    Accepts a single entity_id, as stored by older entries, or a list.
+    """
+    value = config.get(key)
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(value)
+
+
+def config_wiring(config):
+    """Return the (main, stages, sensors, outdoor sensors, weather, price sensor) entity_ids of a configuration."""
+    return (
+        config.get(CONF_MAIN_CLIMATE),
+        tuple(entity_id for entity_id, _ in config_stages(config)),
+        config_sensors(config, CONF_SENSOR),
+        config_sensors(config, CONF_OUTDOOR_SENSOR),
+        config.get(CONF_WEATHER) or None,
+        config.get(CONF_PRICE_SENSOR) or None,
+    )
+
+
+class ControlPlan:
+    """Immutable settings of a Smart Climate controller.
+
+    Plans are shared between entities, so the preset mappings are read-only
+    views.
+    """
+
+    __slots__ = (
+        "heating_presets",
+        "cooling_presets",
+        "preset_modes",
+        "preset_table",
+        "decision_params",
+        "stages",
+        "schedule",
+        "primary_threshold",
+        "outdoor_hot_threshold",
+        "primary_offset",
+        "debounce_seconds",
+        "merge_commands",
+        "min_runtime",
+        "min_off",
+        "max_switches_per_hour",
+        "publish_deadband",
+        "publish_heartbeat",
+        "sensor_fusion",
+        "sensor_window",
+        "sensor_ema_alpha",
+        "sensor_max_age",
+        "predictive_lead",
+        "warm_start_days",
+        "forecast_horizon",
+        "forecast_aggregate",
+        "tariff_margin",
+    )
+
+    def __init__(self, heating_presets, cooling_presets, settings, stages, schedule=()):
+        (
+            primary_threshold,
+            outdoor_hot_threshold,
+            primary_offset,
+            debounce_seconds,
+            merge_commands,
+            min_runtime,
+            min_off,
+            max_switches_per_hour,
+            publish_deadband,
+            publish_heartbeat,
+            sensor_fusion,
+            sensor_window,
+            sensor_ema_alpha,
+            sensor_max_age,
+            predictive_lead,
+            warm_start_days,
+            forecast_horizon,
+            forecast_aggregate,
+            tariff_margin,
+        ) = settings
+        if sensor_fusion not in FUSION_STRATEGIES:
+            raise vol.Invalid(f"Unknown sensor fusion strategy: {sensor_fusion}")
+        if forecast_aggregate not in FORECAST_AGGREGATES:
+            raise vol.Invalid(f"Unknown forecast aggregate: {forecast_aggregate}")
+        heating = dict(heating_presets)
+        cooling = dict(cooling_presets)
+        if not heating and not cooling:
+            raise vol.Invalid("At least one preset is required")
+        for _, preset in schedule:
+            if preset not in heating and preset not in cooling:
+                raise vol.Invalid(f"Unknown preset in schedule: {preset}")
+
+        values = {
+            "heating_presets": MappingProxyType(heating),
+            "cooling_presets": MappingProxyType(cooling),
+            # Heating presets first, then cooling-only presets, without duplicates.
+            "preset_modes": tuple(dict.fromkeys([*heating, *cooling])),
+            "preset_table": MappingProxyType({
+                name: _preset_entry(name, heating, cooling) for name in dict.fromkeys([*heating, *cooling])
+            }),
+            "decision_params": make_params(primary_threshold, outdoor_hot_threshold, primary_offset, stages),
+            "stages": stages,
+            "schedule": Schedule(schedule) if schedule else None,
+            "primary_threshold": primary_threshold,
+            "outdoor_hot_threshold": outdoor_hot_threshold,
+            "primary_offset": primary_offset,
+            "debounce_seconds": debounce_seconds,
+            "merge_commands": merge_commands,
+            "min_runtime": min_runtime,
+            "min_off": min_off,
+            "max_switches_per_hour": max_switches_per_hour,
+            "publish_deadband": publish_deadband,
+            "publish_heartbeat": publish_heartbeat,
+            "sensor_fusion": sensor_fusion,
+            "sensor_window": max(int(sensor_window), 1),
+            "sensor_ema_alpha": sensor_ema_alpha,
+            "sensor_max_age": sensor_max_age,
+            "predictive_lead": predictive_lead,
+            "warm_start_days": warm_start_days,
+            "forecast_horizon": forecast_horizon,
+            "forecast_aggregate": forecast_aggregate,
+            "tariff_margin": tariff_margin,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ControlPlan is immutable")
+
+    def target_for(self, preset_mode, current_temp):
+        """Return the target temperature of a preset at the current temperature.
+
+        Presets with both a heating and a cooling target pick the heating
+        target below their midpoint and the cooling target above it.
+        """
+        in_both, heating, cooling, midpoint = self.preset_table[preset_mode]
+        if not in_both:
+            return heating if heating is not None else cooling
+        if current_temp is None:
+            return heating
+        if midpoint is None:
+            return cooling if heating is None else heating
+        return heating if current_temp < midpoint else cooling
+
+
+def _preset_entry(name, heating, cooling):
+    """Return (in_both, heating, cooling, midpoint) for one preset."""
+    heating_target = heating.get(name)
+    cooling_target = cooling.get(name)
+    in_both = name in heating and name in cooling
+    midpoint = None
+    if in_both and heating_target is not None and cooling_target is not None:
+        midpoint = (heating_target + cooling_target) / 2
+    return in_both, heating_target, cooling_target, midpoint
+
+
+def compile_plan(config, stages=None):
+    """Return the (shared) plan for a configuration.
+
+    Device entity_ids are not part of the plan, so zones that only differ in
+    their devices share a plan. ``stages`` are the ``config_stages`` of the
+    configuration, when the caller already has them. Raises ``vol.Invalid``
+    when the presets or stages or the schedule are malformed.
+    """
+    heating = config.get(CONF_HEATING_PRESETS, DEFAULT_HEATING_PRESETS)
+    cooling = config.get(CONF_COOLING_PRESETS, DEFAULT_COOLING_PRESETS)
+    settings = tuple(
+        default if config.get(key) is None else config.get(key)
+        for key, default in PLAN_SETTINGS
+    )
+    return _compile_plan(
+        _hashable_presets(heating),
+        _hashable_presets(cooling),
+        settings,
+        tuple(stage for _, stage in (config_stages(config) if stages is None else stages)),
+        _hashable_schedule(config.get(CONF_SCHEDULE)),
+    )
+
+
+def _hashable_presets(presets):
+    """Return presets in a hashable form, so identical tables hit the cache.
+
+    JSON strings are parsed once, in the cache; anything else is validated
+    first, as it may hold values that cannot be hashed.
+    """
+    if isinstance(presets, str):
+        return presets
+    return validate_presets(presets)
+
+
+def _hashable_schedule(schedule):
+    """Return a schedule in a hashable form; JSON strings are parsed once, in the cache."""
+    if isinstance(schedule, str) or not schedule:
+        return schedule or ()
+    return validate_schedule(schedule)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _compile_plan(heating, cooling, settings, stages, schedule):
+    return ControlPlan(
+        validate_presets(heating), validate_presets(cooling), settings, stages, validate_schedule(schedule)
+    )
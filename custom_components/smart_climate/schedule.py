@@ -0,0 +1,142 @@
+"""Weekly preset schedule.
+
+A schedule maps days and times to presets, for example::
+
+    mon-fri:
+      "06:30": comfort
+      "22:00": eco
+    sat,sun:
+      "08:00": comfort
+      "23:00": eco
+
+It is compiled into a sorted index of transitions, as minutes since Monday
+00:00. The active slot and the next transition are found with a binary
+search, so an entity only needs a single timer, for its next transition.
+"""
+import json
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+import voluptuous as vol
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def _parse_days(spec):
+    """Return the weekday numbers of a spec like ``mon``, ``mon-fri``, ``sat,sun`` or ``daily``."""
+    days = []
+    for part in str(spec).lower().replace(" ", "").split(","):
+        if part in ("daily", "all"):
+            days.extend(range(7))
+            continue
+        first, _, last = part.partition("-")
+        if first not in DAYS or (last and last not in DAYS):
+            raise vol.Invalid(f"Invalid schedule days: {spec!r}")
+        start = DAYS.index(first)
+        end = DAYS.index(last) if last else start
+        # Ranges may wrap around the week, e.g. fri-mon.
+        days.extend((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    return days
+
+
+def _parse_time(value):
+    """Return the minutes since midnight of ``HH:MM``."""
+    if isinstance(value, int):
+        # YAML 1.1 reads an unquoted 06:30 as sexagesimal minutes.
+        minutes = value
+    else:
+        try:
+            hours, minutes = (int(part) for part in str(value).split(":"))
+        except ValueError as err:
+            raise vol.Invalid(f"Invalid schedule time: {value!r}") from err
+        if not 0 <= minutes < 60:
+            raise vol.Invalid(f"Invalid schedule time: {value!r}")
+        minutes += hours * 60
+    if not 0 <= minutes < MINUTES_PER_DAY:
+        raise vol.Invalid(f"Invalid schedule time: {value!r}")
+    return minutes
+
+
+def validate_schedule(value):
+    """Validate a schedule given as a mapping or a JSON string.
+
+    Returns the transition index: a tuple of (minute of the week, preset)
+    pairs sorted by time, or an empty tuple without a schedule. Later
+    entries win when days overlap.
+    """
+    if not value:
+        return ()
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError as err:
+            raise vol.Invalid(f"Schedule is not valid JSON: {err}") from err
+    if isinstance(value, (tuple, list)) and all(
+        isinstance(item, (tuple, list)) and len(item) == 2 and isinstance(item[0], int) for item in value
+    ):
+        # Already compiled.
+        transitions = dict(value)
+    elif isinstance(value, dict):
+        transitions = {}
+        for days, slots in value.items():
+            if not isinstance(slots, dict):
+                raise vol.Invalid(f"Schedule for {days} must map times to presets")
+            for at, preset in slots.items():
+                if not isinstance(preset, str) or not preset:
+                    raise vol.Invalid(f"Invalid preset in schedule: {preset!r}")
+                minute = _parse_time(at)
+                for day in _parse_days(days):
+                    transitions[day * MINUTES_PER_DAY + minute] = preset
+    else:
+        raise vol.Invalid("Schedule must be a mapping of days to times and presets")
+    for minute, preset in transitions.items():
+        if not 0 <= minute < MINUTES_PER_WEEK or not isinstance(preset, str):
+            raise vol.Invalid(f"Invalid schedule entry: {(minute, preset)!r}")
+    return tuple(sorted(transitions.items()))
+
+
+def minute_of_week(when):
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+class Schedule:
+    """Compiled weekly schedule: parallel, sorted tuples of minutes and presets."""
+
+    __slots__ = ("minutes", "presets")
+
+    def __init__(self, transitions):
+        object.__setattr__(self, "minutes", tuple(minute for minute, _ in transitions))
+        object.__setattr__(self, "presets", tuple(preset for _, preset in transitions))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Schedule is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, Schedule) and (self.minutes, self.presets) == (other.minutes, other.presets)
+
+    def __hash__(self):
+        return hash((self.minutes, self.presets))
+
+    def active_preset(self, when):
+        """Return the preset of the slot ``when`` falls in.
+
+        Before the first transition of the week, the last one of the
+        previous week is still active.
+        """
+        return self.presets[bisect_right(self.minutes, minute_of_week(when)) - 1]
+
+    def next_transition(self, when):
+        """Return (local time, preset) of the first transition after ``when``."""
+        index = bisect_right(self.minutes, minute_of_week(when))
+        if index == len(self.minutes):
+            return _at(when, self.minutes[0] + MINUTES_PER_WEEK), self.presets[0]
+        return _at(when, self.minutes[index]), self.presets[index]
+
+
+def _at(when, minute):
+    """Return the local time of ``minute`` of the week ``when`` is in (may run into the next week)."""
+    day = when.date() - timedelta(days=when.weekday()) + timedelta(days=minute // MINUTES_PER_DAY)
+    hours, minutes = divmod(minute % MINUTES_PER_DAY, 60)
+    return datetime.combine(day, time(hours, minutes), tzinfo=when.tzinfo)
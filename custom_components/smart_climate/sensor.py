@@ -0,0 +1,86 @@
+"""Diagnostic sensors exposing the Smart Climate performance counters.
+
+The sensors are disabled by default and can be enabled per entry from the
+entity settings.
+"""
+from datetime import timedelta
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import EntityCategory, UnitOfTime
+
+from .const import DATA_METRICS, DOMAIN
+
+# The counters only change when the controller runs, so a slow poll is enough.
+SCAN_INTERVAL = timedelta(minutes=1)
+
+# key -> name
+COUNTER_SENSORS = {
+    "updates": "Updates",
+    "updates_coalesced": "Coalesced updates",
+    "commands_sent": "Commands sent",
+    "commands_suppressed": "Commands suppressed",
+    "commands_failed": "Failed command attempts",
+    "switches_suppressed": "Switches suppressed",
+    "sensor_failures": "Sensor read failures",
+    "state_writes_skipped": "State writes skipped",
+}
+
+# key -> (name, histogram attribute)
+LATENCY_SENSORS = {
+    "apply_duration_p95": ("Update duration (p95)", "apply_duration"),
+    "service_call_duration_p95": ("Service call duration (p95)", "service_call_duration"),
+}
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up the diagnostic sensors for a config entry."""
+    metrics = hass.data[DOMAIN][config_entry.entry_id][DATA_METRICS]
+    entities = [
+        SmartClimateCounterSensor(config_entry, metrics, key, name)
+        for key, name in COUNTER_SENSORS.items()
+    ]
+    entities.extend(
+        SmartClimateLatencySensor(config_entry, metrics, key, *description)
+        for key, description in LATENCY_SENSORS.items()
+    )
+    async_add_entities(entities)
+    return True
+
+
+class SmartClimateMetricSensor(SensorEntity):
+    """Base class for a sensor reading one value from the entity metrics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, config_entry, metrics, key, name):
+        self._metrics = metrics
+        self._key = key
+        self._attr_name = f"{config_entry.title} {name}"
+        self._attr_unique_id = f"{config_entry.entry_id}_{key}"
+
+
+class SmartClimateCounterSensor(SmartClimateMetricSensor):
+    """A monotonically increasing counter."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self):
+        return getattr(self._metrics, self._key)
+
+
+class SmartClimateLatencySensor(SmartClimateMetricSensor):
+    """The 95th percentile of a latency histogram, in milliseconds."""
+
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, config_entry, metrics, key, name, histogram):
+        super().__init__(config_entry, metrics, key, name)
+        self._histogram = histogram
+
+    @property
+    def native_value(self):
+        value = getattr(self._metrics, self._histogram).quantile(0.95)
+        return round(value * 1000, 1) if value is not None else None
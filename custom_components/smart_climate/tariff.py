@@ -0,0 +1,150 @@
+"""Tariff-aware planning of heating over the coming day.
+
+With a dynamic tariff, heating can move to the cheapest hours as long as
+the room stays within its comfort band. The planner simulates the room
+with the learned thermal model over the price slots and switches heating
+on in the cheapest slot before each point where the room would drop below
+the band, until it no longer does. The model is linear in the indoor
+temperature, so a slot is simulated with a few float operations and a
+day of quarter-hour slots is planned in about a millisecond.
+"""
+from bisect import bisect_right
+from datetime import datetime
+
+from homeassistant.util import dt as dt_util
+
+SECONDS_PER_HOUR = 3600
+HORIZON_SECONDS = 24 * SECONDS_PER_HOUR
+
+# Attributes of common price integrations that hold a list of price slots,
+# and the keys those slots use for their start, end and price.
+PRICE_ATTRIBUTES = ("raw_today", "raw_tomorrow", "prices_today", "prices_tomorrow", "prices", "forecast")
+START_KEYS = ("start", "time", "start_time", "startsAt", "datetime")
+END_KEYS = ("end", "end_time", "endsAt")
+PRICE_KEYS = ("value", "price", "total")
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    parsed = dt_util.parse_datetime(str(value))
+    return parsed.timestamp() if parsed is not None else None
+
+
+def _first(item, keys):
+    for key in keys:
+        if item.get(key) is not None:
+            return item[key]
+    return None
+
+
+def parse_prices(state, now):
+    """Return (starts, ends, prices) of the price slots from ``now`` until the horizon.
+
+    The running slot starts at ``now``. Returns None when the entity has no
+    usable price list.
+    """
+    if state is None:
+        return None
+    slots = {}
+    for attribute in PRICE_ATTRIBUTES:
+        items = state.attributes.get(attribute)
+        if not isinstance(items, (list, tuple)):
+            continue
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            start = _timestamp(_first(item, START_KEYS))
+            end = _first(item, END_KEYS)
+            price = _first(item, PRICE_KEYS)
+            if start is None or price is None:
+                continue
+            try:
+                slots[start] = (_timestamp(end) if end is not None else None, float(price))
+            except (TypeError, ValueError):
+                continue
+    if not slots:
+        return None
+
+    starts, ends, prices = [], [], []
+    times = sorted(slots)
+    for index, start in enumerate(times):
+        end, price = slots[start]
+        if end is None:
+            end = times[index + 1] if index + 1 < len(times) else start + SECONDS_PER_HOUR
+        if end <= now or start >= now + HORIZON_SECONDS:
+            continue
+        starts.append(max(start, now))
+        ends.append(end)
+        prices.append(price)
+    if not starts:
+        return None
+    return tuple(starts), tuple(ends), tuple(prices)
+
+
+class TariffPlan:
+    """Planned heating per price slot."""
+
+    __slots__ = ("starts", "ends", "heating")
+
+    def __init__(self, starts, ends, heating):
+        self.starts = starts
+        self.ends = ends
+        self.heating = tuple(heating)
+
+    def heating_at(self, now):
+        """Return whether heating is planned at ``now``, or None outside the plan."""
+        index = bisect_right(self.starts, now) - 1
+        if index < 0 or now >= self.ends[index]:
+            return None
+        return self.heating[index]
+
+    def as_dict(self):
+        return {
+            "slots": len(self.starts),
+            "heating_slots": sum(self.heating),
+            "end": self.ends[-1] if self.ends else None,
+        }
+
+
+def plan_heating(starts, ends, prices, indoor, lower, upper, rate_off, rate_on):
+    """Return the cheapest plan that keeps the room above ``lower``.
+
+    ``rate_off`` and ``rate_on`` are (intercept, slope) of the rate of change
+    in °C per hour, as a function of the indoor temperature, with heating
+    off and on. A heated room is held at ``upper``. Where the band cannot be
+    kept, the plan heats as much as it can and leaves the rest to the
+    reactive controller.
+    """
+    count = len(starts)
+    heating = [False] * count
+    hours = [(end - start) / SECONDS_PER_HOUR for start, end in zip(starts, ends)]
+    temps = [indoor] * (count + 1)
+
+    def simulate(first):
+        for k in range(first, count):
+            temp = temps[k]
+            intercept, slope = rate_on if heating[k] else rate_off
+            after = temp + (intercept + slope * temp) * hours[k]
+            if heating[k] and after > upper:
+                after = max(upper, temp)
+            temps[k + 1] = after
+
+    simulate(0)
+    cheapest = sorted(range(count), key=prices.__getitem__)
+    scan = 0
+    while True:
+        violation = next((k for k in range(scan, count) if temps[k + 1] < lower), None)
+        if violation is None:
+            break
+        slot = next(
+            (k for k in cheapest if k <= violation and not heating[k] and temps[k] < upper),
+            None,
+        )
+        if slot is None:
+            # Nothing left to heat before this point; plan the rest of the day.
+            scan = violation + 1
+            continue
+        heating[slot] = True
+        simulate(slot)
+    return TariffPlan(starts, ends, heating)
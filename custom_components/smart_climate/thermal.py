@@ -0,0 +1,182 @@
+"""Online thermal model of a zone, fitted with recursive least squares.
+
+The model explains the rate of change of the indoor temperature (°C per
+hour) as
+
+    rate = loss * (outdoor - indoor) + sum(gain * device running) + bias
+
+with a heating and a cooling gain per device. Every sample updates the fit
+in a fixed number of operations; no history is kept or re-scanned.
+
+Forgetting only discounts the parameters a sample excites. A gain that is
+not used for months (cooling in winter) keeps its covariance instead of
+growing it without bound, and the trace of the covariance is capped as a
+last resort.
+"""
+import math
+
+from .decision import MODE_COOL, MODE_HEAT
+
+SECONDS_PER_HOUR = 3600
+
+# Samples closer together than this are skipped, as sensor rounding would
+# dominate the measured rate; longer gaps restart the sampling.
+MIN_SAMPLE_SECONDS = 120
+MAX_SAMPLE_SECONDS = 3600
+
+# Older samples weigh less, so the model follows seasonal changes.
+FORGETTING_FACTOR = 0.999
+INITIAL_COVARIANCE = 100.0
+# Per parameter; a larger trace is scaled back down.
+MAX_COVARIANCE = 10 * INITIAL_COVARIANCE
+_DISCOUNT = 1 / math.sqrt(FORGETTING_FACTOR)
+
+
+class ThermalModel:
+    """Recursive least squares fit of the room temperature rate."""
+
+    __slots__ = ("devices", "theta", "covariance", "samples", "_last")
+
+    def __init__(self, devices):
+        self.devices = tuple(devices)
+        size = 2 + 2 * len(self.devices)
+        self.theta = [0.0] * size
+        self.covariance = [
+            [INITIAL_COVARIANCE if row == column else 0.0 for column in range(size)]
+            for row in range(size)
+        ]
+        self.samples = 0
+        # (time, indoor, features) of the previous sample.
+        self._last = None
+
+    @property
+    def loss_rate(self):
+        """Return the learned heat loss, in °C per hour per °C of indoor/outdoor difference."""
+        return self.theta[0]
+
+    @property
+    def gains(self):
+        """Return {device: (heating gain, cooling gain)} in °C per hour."""
+        return {
+            device: (self.theta[2 + 2 * index], self.theta[3 + 2 * index])
+            for index, device in enumerate(self.devices)
+        }
+
+    def features(self, indoor, outdoor, modes):
+        """Return the regressors for a state; ``modes`` holds one mode per device."""
+        features = [0.0 if outdoor is None else outdoor - indoor, 1.0]
+        for mode in modes:
+            features.append(1.0 if mode == MODE_HEAT else 0.0)
+            features.append(1.0 if mode == MODE_COOL else 0.0)
+        return features
+
+    def due(self, now):
+        """Return whether a sample taken at ``now`` would be used."""
+        return self._last is None or now - self._last[0] >= MIN_SAMPLE_SECONDS
+
+    def observe(self, now, indoor, outdoor, modes):
+        """Record a sample; the rate since the previous sample updates the fit.
+
+        The state of the previous sample is used as the cause of the change,
+        as that is what the devices were doing during the interval.
+        """
+        if not self.due(now):
+            return
+        last = self._last
+        self._last = (now, indoor, self.features(indoor, outdoor, modes))
+        if last is None:
+            return
+        elapsed = now - last[0]
+        if elapsed > MAX_SAMPLE_SECONDS:
+            return
+        self.update(last[2], (indoor - last[1]) * SECONDS_PER_HOUR / elapsed)
+
+    def update(self, features, rate):
+        """Update the fit with one measured rate (RLS step with selective forgetting)."""
+        # Most regressors are 0 (devices that are off), so only use the others.
+        active = [(k, x) for k, x in enumerate(features) if x]
+        # Forget the excited parameters only: P = D P D, with D = 1 / sqrt(lambda)
+        # for the active regressors and 1 for the others.
+        discount = [1.0] * len(features)
+        for k, _ in active:
+            discount[k] = _DISCOUNT
+        for row, d_row in zip(self.covariance, discount):
+            row[:] = [value * d_row * d for value, d in zip(row, discount)]
+        # P x, the direction of the update.
+        projected = [sum(row[k] * x for k, x in active) for row in self.covariance]
+        denominator = 1.0 + sum(projected[k] * x for k, x in active)
+        error = rate - sum(self.theta[k] * x for k, x in active)
+        scale = error / denominator
+        self.theta = [t + p * scale for t, p in zip(self.theta, projected)]
+        # P = P - P x x^T P / denominator, in place; P is symmetric.
+        for row, p_row in zip(self.covariance, projected):
+            factor = p_row / denominator
+            row[:] = [value - factor * p for value, p in zip(row, projected)]
+        trace = sum(self.covariance[k][k] for k in range(len(features)))
+        if trace > MAX_COVARIANCE * len(features):
+            shrink = MAX_COVARIANCE * len(features) / trace
+            for row in self.covariance:
+                row[:] = [value * shrink for value in row]
+        self.samples += 1
+
+    def rebase(self, offset):
+        """Move the time of the last sample by ``offset`` seconds, to continue on another clock."""
+        if self._last is not None:
+            self._last = (self._last[0] + offset, *self._last[1:])
+
+    def rate(self, indoor, outdoor, modes):
+        """Return the predicted rate of change in °C per hour."""
+        return sum(t * x for t, x in zip(self.theta, self.features(indoor, outdoor, modes)))
+
+    def predict(self, indoor, outdoor, modes, seconds):
+        """Return the predicted indoor temperature after ``seconds``."""
+        return indoor + self.rate(indoor, outdoor, modes) * seconds / SECONDS_PER_HOUR
+
+    def time_to(self, indoor, target, outdoor, modes):
+        """Return the seconds until ``target`` is reached, or None if it is not approached."""
+        rate = self.rate(indoor, outdoor, modes)
+        if rate == 0 or (target - indoor) / rate < 0:
+            return None
+        return (target - indoor) / rate * SECONDS_PER_HOUR
+
+    def anticipate(self, indoor, target, outdoor, modes, seconds):
+        """Return the indoor temperature to act on, ``seconds`` ahead.
+
+        That is the prediction, unless ``target`` is reached before then:
+        the target itself is returned, so the devices stop as the room gets
+        there instead of the prediction running past it into the opposite mode.
+        """
+        reached = self.time_to(indoor, target, outdoor, modes)
+        if reached is not None and reached <= seconds:
+            return target
+        return self.predict(indoor, outdoor, modes, seconds)
+
+    def as_dict(self):
+        return {
+            "devices": list(self.devices),
+            "theta": list(self.theta),
+            "covariance": [list(row) for row in self.covariance],
+            "samples": self.samples,
+        }
+
+    @classmethod
+    def from_dict(cls, data, devices):
+        """Return a model restored from ``as_dict``, or None if it does not fit ``devices``."""
+        try:
+            if tuple(data["devices"]) != tuple(devices):
+                return None
+            model = cls(devices)
+            size = len(model.theta)
+            theta = [float(value) for value in data["theta"]]
+            covariance = [[float(value) for value in row] for row in data["covariance"]]
+            if len(theta) != size or len(covariance) != size or any(len(row) != size for row in covariance):
+                return None
+            if not all(map(math.isfinite, theta)) or not all(math.isfinite(value) for row in covariance for value in row):
+                # A diverged fit is worse than starting over.
+                return None
+            model.theta = theta
+            model.covariance = covariance
+            model.samples = int(data["samples"])
+            return model
+        except (KeyError, TypeError, ValueError):
+            return None
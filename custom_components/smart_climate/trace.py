@@ -0,0 +1,89 @@
+"""Fixed-size trace of the recent decisions of an entity.
+
+Every field is a typed array of ``size`` slots that is overwritten in a
+ring, so recording a decision is a handful of array writes, without any
+allocation or formatting. The trace is only turned into readable entries
+when it is downloaded with the diagnostics.
+"""
+from array import array
+from datetime import datetime, timezone
+
+from .decision import CODE_COOL, CODE_HEAT, CODE_OFF, MODE_CODES, MODE_COOL, MODE_HEAT
+
+TRACE_SIZE = 256
+
+_MODE_CODE = {MODE_HEAT: CODE_HEAT, MODE_COOL: CODE_COOL}
+_NAN = float("nan")
+
+
+class DecisionTrace:
+    """Ring buffer of decisions.
+
+    Devices are bits in the ``stages``, ``sent`` and ``held`` masks: the main
+    device is bit 0 and stage ``k`` is bit ``k + 1``. A device that needed
+    no command has neither its sent nor its held bit set. ``outdoor`` is
+    the temperature the cooling gate used: the outdoor reading or the
+    forecast.
+    """
+
+    __slots__ = ("size", "count", "index", "time", "indoor", "outdoor", "target", "diff", "mode", "stages", "sent", "held")
+
+    def __init__(self, size=TRACE_SIZE):
+        self.size = max(int(size), 1)
+        self.count = 0
+        self.index = 0
+        self.time = array("d", [0.0]) * self.size
+        self.indoor = array("d", [0.0]) * self.size
+        self.outdoor = array("d", [0.0]) * self.size
+        self.target = array("d", [0.0]) * self.size
+        self.diff = array("d", [0.0]) * self.size
+        self.mode = array("b", [0]) * self.size
+        self.stages = array("L", [0]) * self.size
+        self.sent = array("L", [0]) * self.size
+        self.held = array("L", [0]) * self.size
+
+    def record(self, now, indoor, outdoor, target, mode, diff, stages, sent, held):
+        """Record one decision; ``now`` is a Unix timestamp."""
+        index = self.index
+        self.time[index] = now
+        self.indoor[index] = indoor
+        self.outdoor[index] = _NAN if outdoor is None else outdoor
+        self.target[index] = _NAN if target is None else target
+        self.mode[index] = _MODE_CODE.get(mode, CODE_OFF)
+        self.diff[index] = diff
+        self.stages[index] = stages
+        self.sent[index] = sent
+        self.held[index] = held
+        self.index = index + 1 if index + 1 < self.size else 0
+        if self.count < self.size:
+            self.count += 1
+
+    def entries(self, devices):
+        """Return the recorded decisions, oldest first, as dictionaries.
+
+        ``devices`` are the entity_ids of the devices, main device first;
+        the masks are listed as the entity_ids they contain.
+        """
+        start = (self.index - self.count) % self.size
+        return [self._entry((start + offset) % self.size, devices) for offset in range(self.count)]
+
+    def _entry(self, index, devices):
+        return {
+            "time": datetime.fromtimestamp(self.time[index], timezone.utc).isoformat(),
+            "indoor": self.indoor[index],
+            "outdoor": _optional(self.outdoor[index]),
+            "target": _optional(self.target[index]),
+            "mode": MODE_CODES[self.mode[index]],
+            "diff": self.diff[index],
+            "stages_on": _members(self.stages[index], devices),
+            "sent": _members(self.sent[index], devices),
+            "held": _members(self.held[index], devices),
+        }
+
+
+def _members(mask, devices):
+    return [device for bit, device in enumerate(devices) if mask >> bit & 1]
+
+
+def _optional(value):
+    return None if value != value else value
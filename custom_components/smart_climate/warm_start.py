@@ -0,0 +1,133 @@
+"""Warm start of the learned state from the recorder history.
+
+The history of all sensors and devices of a zone is loaded window by
+window, with one recorder query per window, and every window is replayed
+through a fresh thermal model before the next one is loaded, so only one
+window of states is held in memory. Both run in the recorder's executor,
+so neither blocks the event loop, and the entity is controlling its
+devices while the replay is still running.
+"""
+import heapq
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+
+from .coordinator import UNAVAILABLE_STATES
+from .decision import MODE_OFF
+from .fusion import SensorFusion
+from .thermal import ThermalModel
+
+# History loaded and replayed per executor job; the replay can be cancelled
+# between windows.
+WINDOW = timedelta(hours=6)
+# The recorder leaves out both ends of a range, so windows overlap by this much.
+WINDOW_OVERLAP = timedelta(microseconds=1)
+
+
+class HistoryReplay:
+    """Replay recorded states through a fresh thermal model.
+
+    The history is fed in consecutive windows. Besides the model, the times
+    every device switched on or off are collected, for the cycle protection.
+    """
+
+    def __init__(self, sensors, outdoor_sensors, devices, plan):
+        self.model = ThermalModel(devices)
+        self.switches = {device: [] for device in devices}
+        self.rows = 0
+        self._indoor = _fusion(sensors, plan)
+        self._outdoor = _fusion(outdoor_sensors, plan) if outdoor_sensors else None
+        self._modes = dict.fromkeys(devices, MODE_OFF)
+
+    def replay(self, history):
+        """Replay one window of history.
+
+        ``history`` maps entity_ids to time-ordered (timestamp, state) pairs,
+        with timestamps in epoch seconds. The entities are merged in time
+        order without building one big list.
+        """
+        for timestamp, entity_id, state in heapq.merge(
+            *(_tagged(entity_id, rows) for entity_id, rows in history.items())
+        ):
+            self.rows += 1
+            self._process(timestamp, entity_id, state)
+
+    def _process(self, timestamp, entity_id, state):
+        if state in UNAVAILABLE_STATES:
+            return
+        if entity_id in self._modes:
+            if (self._modes[entity_id] != MODE_OFF) != (state != MODE_OFF):
+                self.switches[entity_id].append(timestamp)
+            self._modes[entity_id] = state
+            return
+
+        try:
+            value = float(state)
+        except ValueError:
+            return
+        if self._outdoor is not None and entity_id in self._outdoor.entity_ids:
+            self._outdoor.add(entity_id, value, timestamp)
+            return
+        self._indoor.add(entity_id, value, timestamp)
+        indoor = self._indoor.value(timestamp)
+        if indoor is None:
+            return
+        outdoor = self._outdoor.value(timestamp) if self._outdoor is not None else None
+        self.model.observe(timestamp, indoor, outdoor, [self._modes[device] for device in self.model.devices])
+
+
+def _fusion(sensors, plan):
+    return SensorFusion(
+        sensors, plan.sensor_fusion, plan.sensor_window, plan.sensor_ema_alpha, plan.sensor_max_age
+    )
+
+
+def _tagged(entity_id, rows):
+    for timestamp, state in rows:
+        yield timestamp, entity_id, state
+
+
+def _load_history(hass, start, end, entity_ids, include_start_time_state):
+    """Query the recorder for all entities at once; runs in the executor."""
+    from homeassistant.components.recorder import history
+
+    states = history.get_significant_states(
+        hass,
+        start,
+        end,
+        entity_ids=entity_ids,
+        include_start_time_state=include_start_time_state,
+        significant_changes_only=False,
+        no_attributes=True,
+    )
+    return {
+        entity_id: [(state.last_updated.timestamp(), state.state) for state in rows]
+        for entity_id, rows in states.items()
+    }
+
+
+def _replay_window(hass, replay, start, end, entity_ids, include_start_time_state):
+    """Load one window of history and replay it; runs in the executor."""
+    replay.replay(_load_history(hass, start, end, entity_ids, include_start_time_state))
+
+
+async def async_replay_history(hass, sensors, outdoor_sensors, devices, plan, start):
+    """Return a finished HistoryReplay of the history since ``start``, or None without a recorder."""
+    if "recorder" not in hass.config.components:
+        return None
+    from homeassistant.components.recorder import get_instance
+
+    instance = get_instance(hass)
+    entity_ids = [*sensors, *outdoor_sensors, *devices]
+    replay = HistoryReplay(sensors, outdoor_sensors, devices, plan)
+    now = dt_util.utcnow()
+    window_start = window_end = start
+    while window_end < now:
+        window_end = min(window_end + WINDOW, now)
+        # Only the first window needs the states at its start; later
+        # windows continue where the previous one ended.
+        await instance.async_add_executor_job(
+            _replay_window, hass, replay, window_start, window_end, entity_ids, window_start is start
+        )
+        window_start = window_end - WINDOW_OVERLAP
+    return replay
@@ -0,0 +1,330 @@
+"""Tests for the SmartClimate entity, driven through the benchmark harness."""
+import asyncio
+import logging
+import tempfile
+from datetime import timedelta
+from types import MappingProxyType, SimpleNamespace
+
+import pytest
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
+from homeassistant.core import CoreState, HomeAssistant, State
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry, entity_platform, entity_registry, restore_state
+from homeassistant.helpers import entity as entity_helper
+from homeassistant.util import dt as dt_util
+
+from benchmarks.harness import FakeHass, build_entities, make_config
+from custom_components.smart_climate import async_update_options, climate
+from custom_components.smart_climate.climate import SmartClimateExtraStoredData
+from custom_components.smart_climate.const import (
+    CONF_HEATING_PRESETS,
+    CONF_MAIN_CLIMATE,
+    CONF_MIN_OFF_SECONDS,
+    CONF_MIN_RUNTIME_SECONDS,
+    CONF_PREDICTIVE_LEAD_SECONDS,
+    CONF_PUBLISH_DEADBAND,
+    CONF_PUBLISH_HEARTBEAT_SECONDS,
+    CONF_SENSOR,
+    CONF_SENSOR_MAX_AGE_SECONDS,
+    DATA_COORDINATOR,
+    DATA_ENTITY,
+    DOMAIN,
+    MODEL_MIN_SAMPLES,
+)
+from custom_components.smart_climate.coordinator import SmartClimateCoordinator
+from custom_components.smart_climate.plan import compile_plan
+
+
+async def create(**overrides):
+    hass = FakeHass()
+    entity = (await build_entities(hass, [make_config(0, **overrides)]))[0]
+    hass.states.async_set("climate.main_0", "off", {})
+    hass.states.async_set("climate.secondary_0", "off", {})
+    hass.states.async_set("sensor.outdoor", "5.0")
+    return hass, entity
+
+
+def test_updates_requested_during_a_run_are_coalesced():
+    async def main():
+        entity = (await create())[1]
+        release = asyncio.Event()
+        runs = []
+
+        async def apply(snapshot=None):
+            runs.append(snapshot)
+            await release.wait()
+
+        entity._apply_temperature = apply
+        first = asyncio.create_task(entity._async_run_update({"sensor.indoor_0": (20.0, 0.0)}))
+        await asyncio.sleep(0)
+        for _ in range(3):
+            await entity._async_run_update()
+        release.set()
+        await first
+        return entity, runs
+
+    entity, runs = asyncio.run(main())
+    # Three requests during the first run result in one more run, on fresh readings.
+    assert runs == [{"sensor.indoor_0": (20.0, 0.0)}, None]
+    assert entity.coalesced_updates == 3
+    assert entity._metrics.updates == 2
+
+
+def test_only_new_sensor_values_schedule_an_update():
+    async def main():
+        return (await create())[1]
+
+    entity = asyncio.run(main())
+    scheduled = []
+    entity._debouncer = SimpleNamespace(async_schedule_call=lambda: scheduled.append(True))
+
+    def change(old, new):
+        entity._async_sensor_changed(SimpleNamespace(data={
+            "old_state": old and State("sensor.indoor_0", old),
+            "new_state": new and State("sensor.indoor_0", new),
+        }))
+
+    change("20.0", "20.0")
+    change("20.0", "unavailable")
+    change("20.0", None)
+    assert not scheduled
+    change(None, "20.0")
+    change("20.0", "20.5")
+    assert len(scheduled) == 2
+
+
+def test_stages_are_held_while_the_main_switch_is_held():
+    async def main():
+        hass, entity = await create(**{CONF_MIN_OFF_SECONDS: 600})
+        hass.states.async_set("sensor.indoor_0", "15.0")
+        entity._attr_target_temperature = 21.0
+        # The main device was switched off just now.
+        entity._main.guard.record_switch(entity._clock())
+        await entity._apply_temperature()
+        await entity.async_join_commands()
+        return hass, entity
+
+    hass, entity = asyncio.run(main())
+    decision = entity.decision_trace.entries(entity.devices)[-1]
+    assert decision["mode"] == "heat"
+    assert decision["held"] == ["climate.main_0", "climate.secondary_0"]
+    # Only the new setpoint of the main device goes out.
+    assert hass.services.calls == [("climate", "set_temperature", {"entity_id": "climate.main_0", "temperature": 22.0})]
+    # Both held switches count as suppressed, in the guards and in the metrics.
+    assert entity.suppressed_switches == entity._metrics.switches_suppressed == 2
+
+
+def test_failed_switch_does_not_use_up_the_cycle_budget():
+    async def main():
+        hass, entity = await create(**{CONF_MIN_RUNTIME_SECONDS: 600})
+        hass.states.async_set("sensor.indoor_0", "15.0")
+        entity._attr_target_temperature = 21.0
+        entity._main.queue._retries = 0
+        call = hass.services.async_call
+
+        async def failing(domain, service, service_data=None, **kwargs):
+            if service_data["entity_id"] == "climate.main_0":
+                raise HomeAssistantError("unreachable")
+            await call(domain, service, service_data, **kwargs)
+
+        hass.services.async_call = failing
+        await entity._apply_temperature()
+        await entity.async_join_commands()
+        failed = entity._main.guard.last_switch
+
+        hass.services.async_call = call
+        await entity._apply_temperature()
+        await entity.async_join_commands()
+        return hass, entity, failed
+
+    hass, entity, failed = asyncio.run(main())
+    assert failed is None
+    # The device is switched on once it answers, and only then is the switch recorded.
+    assert hass.states.get("climate.main_0").state == "heat"
+    assert entity._main.guard.last_switch is not None
+    assert entity.suppressed_switches == 0
+
+
+def test_predictive_lead_stops_heating_without_switching_to_cooling():
+    async def main():
+        hass, entity = await create(**{CONF_PREDICTIVE_LEAD_SECONDS: 3600})
+        hass.states.async_set("climate.main_0", "heat", {"temperature": 22.0})
+        hass.states.async_set("sensor.indoor_0", "20.6")
+        hass.states.async_set("sensor.outdoor", "30.0")
+        entity._attr_target_temperature = 21.0
+        # The room warms up by 1.5 °C per hour while the main device heats.
+        entity._model.theta[2] = 1.5
+        entity._model.samples = MODEL_MIN_SAMPLES
+        await entity._apply_temperature()
+        await entity.async_join_commands()
+        return hass, entity
+
+    hass, entity = asyncio.run(main())
+    # The target is reached within the lead, so heating stops early; the
+    # prediction running past the target does not start cooling on a hot day.
+    assert entity.decision_trace.entries(entity.devices)[-1]["mode"] == "off"
+    assert hass.states.get("climate.main_0").state == "off"
+
+
+def test_state_is_only_written_beyond_the_deadband_or_on_the_heartbeat():
+    async def main():
+        return (await create(**{CONF_PUBLISH_DEADBAND: 0.3, CONF_PUBLISH_HEARTBEAT_SECONDS: 600}))[1]
+
+    entity = asyncio.run(main())
+    assert entity.should_poll is False
+    clock = [1000.0]
+    entity._clock = lambda: clock[0]
+    writes = []
+    entity.async_write_ha_state = lambda: writes.append(entity._attr_current_temperature)
+
+    def publish(temperature, after=0):
+        clock[0] += after
+        entity._attr_current_temperature = temperature
+        entity._async_publish_state()
+
+    publish(20.0)
+    publish(20.2)
+    publish(20.3)
+    publish(20.3, after=600)
+    assert writes == [20.0, 20.3, 20.3]
+
+    # Changes of the target and the schedule attributes are written right away.
+    entity._attr_target_temperature = 22.0
+    publish(20.3)
+    entity._override_until = dt_util.now()
+    publish(20.3)
+    assert len(writes) == 5
+    assert entity.metrics.state_writes_skipped == 1
+
+
+def test_options_are_applied_to_the_running_entity():
+    async def main():
+        hass, entity = await create()
+        hass.states.async_set("sensor.indoor_0", "20.0")
+        entity._select_preset("eco")
+        presets = dict(entity._plan.heating_presets, eco=16.5, night=15.0)
+        await entity.async_apply_plan(compile_plan({**make_config(0), CONF_HEATING_PRESETS: presets, CONF_MIN_RUNTIME_SECONDS: 900}))
+        return entity
+
+    entity = asyncio.run(main())
+    assert entity._main.guard.min_on == 900
+    # The target follows the changed preset, and the new preset is offered.
+    assert entity.target_temperature == 16.5
+    assert "night" in entity.preset_modes
+
+
+def test_options_update_reloads_only_when_the_wiring_changes():
+    async def main(options):
+        hass, entity = await create()
+        hass.states.async_set("sensor.indoor_0", "20.0")
+        reloads = []
+
+        async def async_reload(entry_id):
+            reloads.append(entry_id)
+
+        hass.config_entries = SimpleNamespace(async_reload=async_reload)
+        entry = SimpleNamespace(
+            entry_id="entry", title="Zone", data=MappingProxyType(make_config(0)), options=MappingProxyType(options)
+        )
+        hass.data[DOMAIN] = {entry.entry_id: {DATA_ENTITY: entity}}
+        await async_update_options(hass, entry)
+        return reloads, entity
+
+    reloads, entity = asyncio.run(main({CONF_MIN_RUNTIME_SECONDS: 900}))
+    assert reloads == [] and entity._plan.min_runtime == 900
+    reloads, entity = asyncio.run(main({CONF_MAIN_CLIMATE: "climate.other"}))
+    assert reloads == ["entry"]
+
+
+@pytest.fixture
+def without_last_reported(monkeypatch):
+    """Behave like Home Assistant before 2024.4, which only records changes."""
+    monkeypatch.setattr(climate, "LAST_REPORTED_SUPPORTED", False)
+
+
+def age(hass, entity_id, hours):
+    hass.states.get(entity_id).last_updated = dt_util.utcnow() - timedelta(hours=hours)
+
+
+def test_single_steady_sensor_keeps_controlling(without_last_reported):
+    async def main():
+        hass, entity = await create(**{CONF_SENSOR_MAX_AGE_SECONDS: 900})
+        hass.states.async_set("sensor.indoor_0", "15.0")
+        # Unchanged for two hours, which is all a 2024.1 core can tell.
+        age(hass, "sensor.indoor_0", 2)
+        entity._attr_target_temperature = 21.0
+        await entity._apply_temperature()
+        await entity.async_join_commands()
+        return hass, entity
+
+    hass, entity = asyncio.run(main())
+    assert entity.current_temperature == 15.0
+    assert ("climate", "set_hvac_mode", {"entity_id": "climate.main_0", "hvac_mode": "heat"}) in hass.services.calls
+
+
+def test_sensor_that_stopped_reporting_is_dropped_from_the_fusion(without_last_reported):
+    async def main():
+        hass, entity = await create(**{
+            CONF_SENSOR: ["sensor.indoor_0", "sensor.indoor_b"],
+            CONF_SENSOR_MAX_AGE_SECONDS: 900,
+        })
+        hass.states.async_set("sensor.indoor_0", "20.0")
+        hass.states.async_set("sensor.indoor_b", "22.0")
+        fused = entity._read_fused(entity._indoor)
+        # indoor_0 keeps its state, but has not reported for two hours.
+        age(hass, "sensor.indoor_0", 2)
+        return fused, entity._read_fused(entity._indoor)
+
+    assert asyncio.run(main()) == (21.0, 22.0)
+
+
+def test_stored_commands_round_trip():
+    async def main():
+        return (await create())[1]
+
+    entity = asyncio.run(main())
+    stored = entity.extra_restore_state_data.as_dict()
+    restored = SmartClimateExtraStoredData.from_dict(stored)
+    assert restored.commands == entity._previous_commands()
+    assert SmartClimateExtraStoredData.from_dict({"commands": {"main_mode": "heat"}}) is None
+
+
+def test_entity_only_starts_once_home_assistant_has_started():
+    async def main():
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            hass.state = CoreState.starting
+            entity_helper.async_setup(hass)
+            await device_registry.async_load(hass)
+            await entity_registry.async_load(hass)
+            await restore_state.async_load(hass)
+            hass.data[DOMAIN] = {DATA_COORDINATOR: SmartClimateCoordinator(hass, interval=None)}
+            platform = entity_platform.EntityPlatform(
+                hass=hass,
+                logger=logging.getLogger(__name__),
+                domain="climate",
+                platform_name=DOMAIN,
+                platform=None,
+                scan_interval=timedelta(seconds=30),
+                entity_namespace=None,
+            )
+            hass.states.async_set("sensor.indoor_0", "20.5")
+            hass.states.async_set("sensor.outdoor", "12.0")
+            entities = []
+            await climate.async_setup_platform(hass, make_config(0), entities.extend)
+            await platform.async_add_entities(entities)
+            await hass.async_block_till_done()
+            entity = entities[0]
+            before = (entity._metrics.updates, entity.current_temperature, len(hass.data[DOMAIN][DATA_COORDINATOR].entities))
+
+            hass.state = CoreState.running
+            hass.bus.async_fire(EVENT_HOMEASSISTANT_STARTED)
+            await hass.async_block_till_done()
+            after = (entity._metrics.updates, entity.current_temperature, len(hass.data[DOMAIN][DATA_COORDINATOR].entities))
+            await hass.async_stop(force=True)
+        return before, after
+
+    before, after = asyncio.run(main())
+    # Added during the boot, the entity neither reads its sensors nor joins the coordinator.
+    assert before == (0, None, 0)
+    assert after == (1, 20.5, 1)
@@ -0,0 +1,107 @@
+"""Tests for the per-device command queue."""
+import asyncio
+
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.smart_climate.command_queue import DeviceCommandQueue
+from custom_components.smart_climate.dispatch import DeviceCommand
+from custom_components.smart_climate.metrics import EntityMetrics
+
+
+class FakeServices:
+    """Service registry whose calls take ``delays`` and fail ``failures`` times."""
+
+    def __init__(self, failures=0, delays=()):
+        self.failures = failures
+        self.delays = list(delays)
+        self.calls = []
+
+    async def async_call(self, domain, service, service_data, blocking=False):
+        self.calls.append((service, dict(service_data), blocking))
+        await asyncio.sleep(self.delays.pop(0) if self.delays else 0)
+        if self.failures:
+            self.failures -= 1
+            raise HomeAssistantError("rejected")
+
+
+class FakeHass:
+    def __init__(self, services):
+        self.services = services
+
+    def async_create_task(self, target, name=None):
+        return asyncio.get_running_loop().create_task(target)
+
+
+def run_queue(services, submit, **kwargs):
+    """Run ``submit(queue, confirmed)`` and return the confirmed commands."""
+    confirmed = []
+
+    async def main():
+        queue = DeviceCommandQueue(FakeHass(services), "climate.a", backoff=0, **kwargs)
+        await submit(queue, confirmed)
+        await queue.async_join()
+
+    asyncio.run(main())
+    return confirmed
+
+
+def command(temperature, mode="heat"):
+    return DeviceCommand("climate.a", mode, temperature)
+
+
+def test_calls_are_blocking_and_in_order():
+    services = FakeServices()
+
+    async def submit(queue, confirmed):
+        queue.async_submit(command(21.0), confirmed.append)
+
+    assert run_queue(services, submit) == [command(21.0)]
+    assert [(service, blocking) for service, _, blocking in services.calls] == [
+        ("set_hvac_mode", True),
+        ("set_temperature", True),
+    ]
+
+
+def test_last_write_wins_while_a_command_is_in_flight():
+    services = FakeServices(delays=[0.01])
+
+    async def submit(queue, confirmed):
+        queue.async_submit(command(20.0, "off"), confirmed.append)
+        await asyncio.sleep(0)
+        for temperature in (21.0, 22.0, 23.0):
+            queue.async_submit(command(temperature), confirmed.append)
+
+    assert run_queue(services, submit) == [command(20.0, "off"), command(23.0)]
+
+
+def test_rejected_command_is_retried():
+    services = FakeServices(failures=1)
+    metrics = EntityMetrics()
+
+    async def submit(queue, confirmed):
+        queue.async_submit(command(20.0, "off"), confirmed.append)
+
+    assert run_queue(services, submit, metrics=metrics) == [command(20.0, "off")]
+    assert len(services.calls) == 2
+    assert metrics.commands_failed == 1
+    assert metrics.service_call_duration.count == 2
+
+
+def test_gives_up_without_confirming():
+    services = FakeServices(failures=10)
+
+    async def submit(queue, confirmed):
+        queue.async_submit(command(20.0, "off"), confirmed.append)
+
+    assert run_queue(services, submit, retries=2) == []
+    assert len(services.calls) == 3
+
+
+def test_timed_out_command_is_retried():
+    services = FakeServices(delays=[1.0])
+
+    async def submit(queue, confirmed):
+        queue.async_submit(command(20.0, "off"), confirmed.append)
+
+    assert run_queue(services, submit, timeout=0.01) == [command(20.0, "off")]
+    assert len(services.calls) == 2
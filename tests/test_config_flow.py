@@ -0,0 +1,25 @@
+"""Tests for the config and options flows."""
+import asyncio
+from types import SimpleNamespace
+
+from custom_components.smart_climate.config_flow import SmartClimateOptionsFlow
+from custom_components.smart_climate.const import (
+    CONF_MAIN_CLIMATE,
+    CONF_MIN_OFF_SECONDS,
+    CONF_SENSOR,
+    CONF_TEMP_THRESHOLD_PRIMARY,
+    DEFAULT_MIN_OFF_SECONDS,
+)
+
+
+def test_options_form_defaults_to_the_data_with_the_options_applied():
+    entry = SimpleNamespace(
+        data={CONF_MAIN_CLIMATE: "climate.a", CONF_SENSOR: ["sensor.a"], CONF_TEMP_THRESHOLD_PRIMARY: 0.7},
+        options={CONF_MIN_OFF_SECONDS: DEFAULT_MIN_OFF_SECONDS + 60},
+    )
+    result = asyncio.run(SmartClimateOptionsFlow(entry).async_step_init())
+    defaults = {key.schema: key.default() for key in result["data_schema"].schema}
+    assert defaults[CONF_MAIN_CLIMATE] == "climate.a"
+    assert defaults[CONF_SENSOR] == ["sensor.a"]
+    assert defaults[CONF_TEMP_THRESHOLD_PRIMARY] == 0.7
+    assert defaults[CONF_MIN_OFF_SECONDS] == DEFAULT_MIN_OFF_SECONDS + 60
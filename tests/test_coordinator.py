@@ -0,0 +1,88 @@
+"""Tests for the shared update coordinator."""
+import asyncio
+
+from benchmarks.harness import FakeHass, build_entities, make_config
+from custom_components.smart_climate import coordinator
+from custom_components.smart_climate.const import STAGGER_SLOTS
+
+
+def test_shared_sensor_is_parsed_once_per_cycle(monkeypatch):
+    parsed = []
+    parse = coordinator.parse_temperature
+
+    def counting(entity_id, state):
+        parsed.append(entity_id)
+        return parse(entity_id, state)
+
+    monkeypatch.setattr(coordinator, "parse_temperature", counting)
+
+    async def main():
+        hass = FakeHass()
+        entities = await build_entities(hass, [make_config(index) for index in range(2 * STAGGER_SLOTS)])
+        for index in range(len(entities)):
+            hass.states.async_set(f"sensor.indoor_{index}", "20.0")
+        hass.states.async_set("sensor.outdoor", "10.0")
+        shared = coordinator.SmartClimateCoordinator(hass, interval=None)
+        for entity in entities:
+            shared.async_add_entity(entity)
+
+        for _ in range(STAGGER_SLOTS):
+            await shared._async_tick()
+        first = parsed.count("sensor.outdoor")
+        hass.states.async_set("sensor.outdoor", "11.0")
+        for _ in range(STAGGER_SLOTS):
+            await shared._async_tick()
+        return first, parsed.count("sensor.outdoor"), parsed.count("sensor.indoor_0")
+
+    assert asyncio.run(main()) == (1, 2, 2)
+
+
+class FakeTimers:
+    """Record the timers armed by the coordinator instead of scheduling them."""
+
+    def __init__(self, monkeypatch):
+        self.delays = []
+        self.intervals = []
+        self.cancelled = 0
+        monkeypatch.setattr(coordinator, "async_call_later", self.call_later)
+        monkeypatch.setattr(coordinator, "async_track_time_interval", self.track_interval)
+
+    def call_later(self, hass, delay, action):
+        self.delays.append(delay)
+        self.action = action
+        return self.cancel
+
+    def track_interval(self, hass, action, interval):
+        self.intervals.append(interval)
+        return self.cancel
+
+    def cancel(self):
+        self.cancelled += 1
+
+
+def test_timer_only_fires_for_occupied_slots(monkeypatch):
+    timers = FakeTimers(monkeypatch)
+    interval = coordinator.timedelta(seconds=300)
+
+    async def main():
+        hass = FakeHass()
+        entities = await build_entities(hass, [make_config(index) for index in range(100)])
+        shared = coordinator.SmartClimateCoordinator(hass, interval=interval)
+        removers = [shared.async_add_entity(entity) for entity in entities[:3]]
+        # Every armed timer starts at a random point within its first period.
+        assert timers.delays[-1] <= 100
+        await timers.action()
+        periods = [timers.intervals[-1]]
+        removers[2]()
+        await timers.action()
+        periods.append(timers.intervals[-1])
+        for entity in entities[3:]:
+            shared.async_add_entity(entity)
+        await timers.action()
+        periods.append(timers.intervals[-1])
+        return periods
+
+    assert asyncio.run(main()) == [interval / 3, interval / 2, interval / STAGGER_SLOTS]
+    assert all(0 <= delay <= 300 for delay in timers.delays)
+    # Adding 97 entities only re-armed the timer until all slots were occupied.
+    assert len(timers.delays) == 3 + 1 + (STAGGER_SLOTS - 2)
@@ -0,0 +1,41 @@
+"""Tests for the short-cycling protection."""
+from custom_components.smart_climate.cycle_guard import CycleGuard
+
+
+def test_minimum_on_and_off_times():
+    guard = CycleGuard(min_on=300, min_off=600)
+    assert guard.allow(False, True, 0)
+    guard.record_switch(0)
+
+    assert not guard.allow(True, False, 299)
+    assert guard.allow(True, False, 300)
+    guard.record_switch(300)
+
+    assert not guard.allow(False, True, 899)
+    assert guard.allow(False, True, 900)
+    assert guard.suppressed == 2
+
+
+def test_staying_in_the_same_state_is_always_allowed():
+    guard = CycleGuard(min_on=300, min_off=600, max_switches_per_hour=1)
+    guard.record_switch(0)
+    assert guard.allow(True, True, 1)
+    assert guard.allow(False, False, 1)
+    assert guard.suppressed == 0
+
+
+def test_switch_rate_limit_uses_a_sliding_hour():
+    guard = CycleGuard(max_switches_per_hour=2)
+    guard.record_switch(0)
+    guard.record_switch(10)
+    assert not guard.allow(True, False, 20)
+    assert not guard.allow(True, False, 3599)
+    assert guard.allow(True, False, 3600)
+
+
+def test_configure_keeps_the_switch_history():
+    guard = CycleGuard(min_on=300)
+    guard.record_switch(0)
+    guard.configure(600, 0, 0)
+    assert not guard.allow(True, False, 300)
+    assert guard.last_switch == 0
@@ -0,0 +1,89 @@
+"""Tests for the decision engine."""
+import math
+import random
+
+import pytest
+
+from custom_components.smart_climate.decision import (
+    CODE_OFF,
+    MODE_CODES,
+    MODE_COOL,
+    MODE_HEAT,
+    MODE_OFF,
+    STAGE_OFF,
+    Stage,
+    decide,
+    decide_batch,
+    initial_commands,
+    make_params,
+)
+
+PARAMS = make_params(0.5, 25.0, 1.0, (
+    Stage(2.0, 0.5, (MODE_HEAT, MODE_COOL)),
+    Stage(1.0, 0.0, (MODE_HEAT,)),
+))
+
+
+def test_heats_below_the_band_and_boosts_with_the_difference():
+    decision = decide(18.5, 10.0, 20.0, PARAMS)
+    assert decision.effective_mode == MODE_HEAT
+    assert decision.commands.main_temp == 21.0
+    # The difference (1.5) is only above the threshold of the second stage.
+    assert decision.commands.stages == (STAGE_OFF, (MODE_HEAT, 20.0))
+
+
+def test_cooling_is_suppressed_when_it_is_not_hot_outside():
+    decision = decide(23.0, 20.0, 20.0, PARAMS)
+    assert decision.effective_mode == MODE_OFF
+    assert decision.cooling_suppressed
+
+    decision = decide(23.0, 30.0, 20.0, PARAMS)
+    assert decision.effective_mode == MODE_COOL
+    # The heat-only stage stays off while cooling.
+    assert decision.commands.stages == ((MODE_COOL, 20.5), STAGE_OFF)
+
+
+def test_no_target_switches_everything_off():
+    previous = decide(15.0, 10.0, 20.0, PARAMS).commands
+    decision = decide(15.0, 10.0, None, PARAMS, previous)
+    assert decision.effective_mode == MODE_OFF
+    assert decision.send_main_mode
+    assert decision.send_stages == (True, True)
+
+
+def test_decide_batch_matches_decide():
+    pytest.importorskip("numpy")
+    rng = random.Random(42)
+    rows = []
+    for _ in range(2000):
+        target = None if rng.random() < 0.05 else rng.choice([19.0, 20.0, 21.5])
+        outdoor = None if rng.random() < 0.1 else rng.uniform(15.0, 35.0)
+        rows.append((rng.uniform(15.0, 26.0), outdoor, target))
+
+    nan = float("nan")
+    batch = decide_batch(
+        [current for current, _, _ in rows],
+        [nan if outdoor is None else outdoor for _, outdoor, _ in rows],
+        [nan if target is None else target for _, _, target in rows],
+        PARAMS,
+    )
+
+    previous = initial_commands(len(PARAMS.stages))
+    for index, (current, outdoor, target) in enumerate(rows):
+        decision = decide(current, outdoor, target, PARAMS, previous)
+        assert MODE_CODES[batch["effective_mode"][index]] == decision.effective_mode
+        assert batch["diff"][index] == pytest.approx(decision.diff)
+        assert bool(batch["cooling_suppressed"][index]) == decision.cooling_suppressed
+        assert bool(batch["send_main_mode"][index]) == decision.send_main_mode
+        assert bool(batch["send_main_temp"][index]) == decision.send_main_temp
+        if decision.effective_mode != MODE_OFF:
+            assert batch["main_temp"][index] == pytest.approx(decision.commands.main_temp)
+        for stage, command in enumerate(decision.commands.stages):
+            assert MODE_CODES[batch["stage_mode"][stage][index]] == command.mode
+            temp = batch["stage_temp"][stage][index]
+            if command.mode == MODE_OFF:
+                assert batch["stage_mode"][stage][index] == CODE_OFF and math.isnan(temp)
+            else:
+                assert temp == pytest.approx(command.temp)
+            assert bool(batch["send_stage"][stage][index]) == decision.send_stages[stage]
+        previous = decision.commands
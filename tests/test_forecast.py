@@ -0,0 +1,80 @@
+"""Tests for the shared weather forecast cache."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.smart_climate.const import FORECAST_RETRY_SECONDS
+from custom_components.smart_climate.forecast import FORECAST_MEAN, FORECAST_PEAK, ForecastCache
+
+START = datetime(2024, 7, 1, 12, tzinfo=timezone.utc)
+NOW = START.timestamp() + 600
+
+
+class FakeWeather:
+    """Serve an hourly forecast of 20, 22, 24, ... °C from START on."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def async_call(self, domain, service, service_data, blocking=False, return_response=False):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise HomeAssistantError("weather service unavailable")
+        forecast = [
+            {"datetime": (START + timedelta(hours=hour)).isoformat(), "temperature": 20 + 2 * hour}
+            for hour in range(12)
+        ]
+        return {service_data["entity_id"]: {"forecast": forecast}}
+
+
+def make_cache(clock):
+    weather = FakeWeather()
+    hass = SimpleNamespace(
+        services=weather,
+        async_create_task=lambda target: asyncio.get_running_loop().create_task(target),
+    )
+    return ForecastCache(hass, ttl=3600, clock=lambda: clock[0]), weather
+
+
+def test_forecast_is_fetched_once_for_all_readers():
+    clock = [0.0]
+
+    async def main():
+        cache, weather = make_cache(clock)
+        # Nothing is known until the background fetch is done.
+        first = [cache.outlook("weather.home", 3, FORECAST_MEAN, NOW) for _ in range(10)]
+        await asyncio.sleep(0.01)
+        return cache, weather, first
+
+    cache, weather, first = asyncio.run(main())
+    assert first == [None] * 10
+    assert weather.calls == cache.fetches == 1
+    # The running hour and the next three.
+    assert cache.outlook("weather.home", 3, FORECAST_MEAN, NOW) == 23.0
+    assert cache.outlook("weather.home", 3, FORECAST_PEAK, NOW) == 26.0
+
+
+def test_forecast_is_refreshed_after_the_ttl_and_retried_after_a_failure():
+    clock = [0.0]
+
+    async def main():
+        cache, weather = make_cache(clock)
+        calls = []
+        for now, fail in ((0, False), (3599, False), (3600, True), (3600 + FORECAST_RETRY_SECONDS - 1, False),
+                          (3600 + FORECAST_RETRY_SECONDS, False)):
+            clock[0] = now
+            weather.fail = fail
+            cache.outlook("weather.home", 3, FORECAST_MEAN, NOW)
+            await asyncio.sleep(0.01)
+            calls.append(weather.calls)
+        return cache, calls
+
+    cache, calls = asyncio.run(main())
+    # Fetched at the start, refreshed (and failed) once expired, then
+    # retried after the retry delay; the old forecast stays in use meanwhile.
+    assert calls == [1, 1, 2, 2, 3]
+    assert cache.outlook("weather.home", 3, FORECAST_MEAN, NOW) == 23.0
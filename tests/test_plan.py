@@ -0,0 +1,21 @@
+"""Tests for compiling configurations into control plans."""
+import pytest
+import voluptuous as vol
+
+from benchmarks.harness import make_config
+from custom_components.smart_climate.const import CONF_HEATING_PRESETS
+from custom_components.smart_climate.plan import compile_plan
+
+
+def test_identical_configurations_share_a_plan():
+    presets = {"eco": 15, "comfort": 20}
+    first = compile_plan({**make_config(0), CONF_HEATING_PRESETS: presets})
+    second = compile_plan({**make_config(0), CONF_HEATING_PRESETS: dict(presets)})
+    assert first is second
+    assert first.heating_presets["eco"] == 15.0
+
+
+@pytest.mark.parametrize("presets", [{"eco": [15]}, {"eco": {"temperature": 15}}, (("eco", [15]),)])
+def test_unhashable_preset_values_are_rejected(presets):
+    with pytest.raises(vol.Invalid):
+        compile_plan({**make_config(0), CONF_HEATING_PRESETS: presets})
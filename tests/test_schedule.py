@@ -0,0 +1,54 @@
+"""Tests for the weekly preset schedule."""
+from datetime import datetime, timezone
+
+import pytest
+import voluptuous as vol
+
+from custom_components.smart_climate.schedule import MINUTES_PER_DAY, Schedule, validate_schedule
+
+WEEKDAYS = {
+    "mon-fri": {"06:30": "comfort", "22:00": "eco"},
+    "sat,sun": {"08:00": "comfort", "23:00": "eco"},
+}
+
+
+def at(day, hour, minute=0):
+    # 2026-10-19 is a Monday.
+    return datetime(2026, 10, 19 + day, hour, minute, tzinfo=timezone.utc)
+
+
+def test_day_ranges_wrap_around_the_week():
+    transitions = validate_schedule({"fri-mon": {"07:00": "comfort"}})
+    assert [minute // MINUTES_PER_DAY for minute, _ in transitions] == [0, 4, 5, 6]
+
+
+def test_before_the_first_transition_the_last_one_of_last_week_is_active():
+    schedule = Schedule(validate_schedule(WEEKDAYS))
+    assert schedule.active_preset(at(0, 5)) == "eco"
+    assert schedule.active_preset(at(0, 7)) == "comfort"
+
+
+def test_next_transition_runs_into_the_next_week():
+    schedule = Schedule(validate_schedule(WEEKDAYS))
+    when, preset = schedule.next_transition(at(6, 23, 30))
+    assert (when, preset) == (at(7, 6, 30), "comfort")
+
+
+def test_json_and_yaml_sexagesimal_times():
+    from_json = validate_schedule('{"daily": {"06:30": "comfort"}}')
+    # YAML 1.1 reads an unquoted 06:30 as 390.
+    from_yaml = validate_schedule({"daily": {390: "comfort"}})
+    assert from_json == from_yaml
+    assert validate_schedule(from_json) == from_json
+
+
+@pytest.mark.parametrize("value", [
+    {"someday": {"06:30": "comfort"}},
+    {"mon": {"25:00": "comfort"}},
+    {"mon": {"06:30": ""}},
+    {"mon": "comfort"},
+    "not json",
+])
+def test_invalid_schedules_are_rejected(value):
+    with pytest.raises(vol.Invalid):
+        validate_schedule(value)
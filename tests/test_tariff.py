@@ -0,0 +1,18 @@
+"""Tests for tariff-aware heating."""
+from custom_components.smart_climate.tariff import plan_heating
+
+HOUR = 3600
+
+
+def test_heats_in_the_cheapest_slot_before_the_room_gets_too_cold():
+    starts = tuple(index * HOUR for index in range(6))
+    ends = tuple(start + HOUR for start in starts)
+    prices = (0.30, 0.10, 0.40, 0.40, 0.05, 0.40)
+    # Without heating the room loses 1 °C per hour, heating adds 3 °C per hour.
+    plan = plan_heating(starts, ends, prices, 21.0, 19.0, 22.0, (-1.0, 0.0), (2.0, 0.0))
+    assert plan.heating_at(1 * HOUR + 10) is True
+    assert plan.heating_at(0) is False
+    assert plan.heating_at(6 * HOUR) is None
+    # The cheapest slot before the room would drop below 19 °C heats; without
+    # a second heated slot it would still end the last hour at 18 °C.
+    assert plan.heating == (False, True, False, False, True, False)
@@ -0,0 +1,66 @@
+"""Tests for the online thermal model."""
+import math
+import random
+
+from custom_components.smart_climate.thermal import MAX_COVARIANCE, ThermalModel
+
+
+def heating_season(model, samples):
+    """Feed ``samples`` of a room with a known model; only the first device heats."""
+    rng = random.Random(1)
+    indoor = 20.0
+    for index in range(samples):
+        outdoor = 5 + 5 * math.sin(index / 288)
+        modes = ("heat" if (index // 20) % 2 else "off", "off")
+        rate = 0.05 * (outdoor - indoor) + (1.5 if modes[0] == "heat" else 0.0) + 0.1 + rng.gauss(0, 0.05)
+        model.update(model.features(indoor, outdoor, modes), rate)
+        indoor += rate * 300 / 3600
+
+
+def test_learns_loss_and_gain():
+    model = ThermalModel(["climate.a", "climate.b"])
+    heating_season(model, 5000)
+    assert abs(model.loss_rate - 0.05) < 0.01
+    assert abs(model.gains["climate.a"][0] - 1.5) < 0.05
+
+
+def test_unexcited_parameters_do_not_blow_up():
+    model = ThermalModel(["climate.a", "climate.b"])
+    heating_season(model, 20000)
+    size = len(model.theta)
+    assert all(math.isfinite(value) for row in model.covariance for value in row)
+    assert sum(model.covariance[k][k] for k in range(size)) <= MAX_COVARIANCE * size
+    # The cooling gains were never used and kept their prior.
+    assert model.covariance[3][3] == model.covariance[5][5] == 100.0
+
+
+def test_a_diverged_model_is_not_restored():
+    model = ThermalModel(["climate.a"])
+    data = model.as_dict()
+    assert ThermalModel.from_dict(data, ["climate.a"]) is not None
+    data["covariance"][0][0] = math.inf
+    assert ThermalModel.from_dict(data, ["climate.a"]) is None
+    assert ThermalModel.from_dict(model.as_dict(), ["climate.b"]) is None
+
+
+def heating_model():
+    """Return a model of a room that only warms up, by 1.5 °C per hour, while heating."""
+    model = ThermalModel(["climate.a"])
+    model.theta = [0.0, 0.0, 1.5, 0.0]
+    return model
+
+
+def test_time_to_target():
+    model = heating_model()
+    assert model.time_to(20.0, 21.0, 5.0, ["heat"]) == 2400
+    # Moving away from the target, or not moving at all, never gets there.
+    assert model.time_to(22.0, 21.0, 5.0, ["heat"]) is None
+    assert model.time_to(20.0, 21.0, 5.0, ["off"]) is None
+
+
+def test_anticipation_stops_at_the_target():
+    model = heating_model()
+    assert model.anticipate(20.0, 21.0, 5.0, ["heat"], 600) == 20.25
+    # Reached within the lead: act on the target, not on the overshoot.
+    assert model.anticipate(20.0, 21.0, 5.0, ["heat"], 3600) == 21.0
+    assert model.anticipate(20.0, 19.0, 5.0, ["heat"], 3600) == 21.5
@@ -0,0 +1,37 @@
+"""Tests for the ring buffer of recent decisions."""
+from custom_components.smart_climate.trace import DecisionTrace
+
+DEVICES = ["climate.main", "climate.boost"]
+
+
+def record(trace, now, target=21.0, outdoor=None):
+    trace.record(now, 20.0 + now / 10, outdoor, target, "heat", 1.0, 0b11, 0b01, 0b10)
+
+
+def test_entries_are_listed_oldest_first():
+    trace = DecisionTrace(size=4)
+    record(trace, 1, outdoor=5.0)
+    record(trace, 2, target=None)
+    entries = trace.entries(DEVICES)
+    assert [entry["indoor"] for entry in entries] == [20.1, 20.2]
+    assert entries[0] == {
+        "time": "1970-01-01T00:00:01+00:00",
+        "indoor": 20.1,
+        "outdoor": 5.0,
+        "target": 21.0,
+        "mode": "heat",
+        "diff": 1.0,
+        "stages_on": DEVICES,
+        "sent": ["climate.main"],
+        "held": ["climate.boost"],
+    }
+    # Unknown temperatures are kept as NaN and listed as None.
+    assert entries[1]["outdoor"] is None and entries[1]["target"] is None
+
+
+def test_oldest_decisions_are_overwritten():
+    trace = DecisionTrace(size=4)
+    for now in range(1, 11):
+        record(trace, now)
+    assert trace.count == 4
+    assert [entry["indoor"] for entry in trace.entries(DEVICES)] == [20.7, 20.8, 20.9, 21.0]
@@ -0,0 +1,62 @@
+"""Tests for the warm start from the recorder history."""
+import asyncio
+import sys
+from datetime import timedelta
+from types import SimpleNamespace
+
+from homeassistant.util import dt as dt_util
+
+from benchmarks.harness import make_config
+from custom_components.smart_climate import warm_start
+from custom_components.smart_climate.plan import compile_plan
+
+
+class FakeRecorder:
+    """Run executor jobs inline and serve the history of a heated room."""
+
+    def __init__(self, start):
+        self.start = start.timestamp()
+        self.windows = []
+
+    async def async_add_executor_job(self, target, *args):
+        return target(*args)
+
+    def load_history(self, hass, start, end, entity_ids, include_start_time_state):
+        self.windows.append((start, end, include_start_time_state))
+        history = {entity_id: [] for entity_id in entity_ids}
+        timestamp = self.start + 300
+        while timestamp < self.start + 24 * 3600:
+            if start.timestamp() < timestamp < end.timestamp():
+                heating = (timestamp - self.start) // 3600 % 2 == 0
+                history["climate.main_0"].append((timestamp, "heat" if heating else "off"))
+                history["sensor.indoor_0"].append((timestamp, str(20 + (timestamp - self.start) % 3600 / 3600)))
+            timestamp += 300
+        return history
+
+
+def test_history_is_replayed_window_by_window(monkeypatch):
+    now = dt_util.utcnow()
+    start = now - timedelta(days=1)
+    monkeypatch.setattr(dt_util, "utcnow", lambda: now)
+    fake = FakeRecorder(start)
+    # The recorder itself is not imported; it needs the full Home Assistant install.
+    monkeypatch.setitem(sys.modules, "homeassistant.components.recorder", SimpleNamespace(get_instance=lambda hass: fake))
+    monkeypatch.setattr(warm_start, "_load_history", fake.load_history)
+    hass = SimpleNamespace(config=SimpleNamespace(components={"recorder"}))
+
+    replay = asyncio.run(warm_start.async_replay_history(
+        hass, ["sensor.indoor_0"], [], ["climate.main_0"], compile_plan(make_config(0)), start
+    ))
+
+    assert len(fake.windows) == 4
+    # Windows follow each other without gaps, and only the first one asks
+    # for the states at its start.
+    assert [window[2] for window in fake.windows] == [True, False, False, False]
+    assert all(
+        later[0] < earlier[1] for earlier, later in zip(fake.windows, fake.windows[1:])
+    )
+    # Every row is replayed exactly once.
+    assert replay.rows == 2 * (24 * 12 - 1)
+    assert replay.model.samples > 0
+    # Switched on at the first row, then every hour.
+    assert len(replay.switches["climate.main_0"]) == 24